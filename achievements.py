@@ -0,0 +1,163 @@
+from datetime import datetime
+
+# События, по которым пересчитываются достижения
+WORKOUT_ADDED = 'workout_added'
+FEEDBACK_SUBMITTED = 'feedback_submitted'
+PROFILE_UPDATED = 'profile_updated'
+PROGRAM_STARTED = 'program_started'
+
+
+def _weight_goal_reached(ctx):
+    """Текущий вес отличается от целевого не более чем на 2 кг"""
+    profile = ctx.get('profile', {})
+    current = profile.get('personal_info', {}).get('weight')
+    target = profile.get('goals', {}).get('target_weight')
+    return bool(current and target) and abs(current - target) <= 2
+
+
+# Декларативный реестр достижений: условие проверяется только на указанных событиях
+ACHIEVEMENT_RULES = [
+    {
+        'id': 'first_workout',
+        'title': '🎖️ Первая тренировка',
+        'description': 'Выполнена первая тренировка',
+        'icon': '🎖️',
+        'events': (WORKOUT_ADDED,),
+        'check': lambda ctx: ctx.get('stats', {}).get('total_workouts', 0) >= 1
+    },
+    {
+        'id': 'dedicated',
+        'title': '🔥 Посвящение',
+        'description': '10 выполненных тренировок',
+        'icon': '🔥',
+        'events': (WORKOUT_ADDED,),
+        'check': lambda ctx: ctx.get('stats', {}).get('total_workouts', 0) >= 10
+    },
+    {
+        'id': 'consistent',
+        'title': '📅 Регулярность',
+        'description': '30 выполненных тренировок',
+        'icon': '📅',
+        'events': (WORKOUT_ADDED,),
+        'check': lambda ctx: ctx.get('stats', {}).get('total_workouts', 0) >= 30
+    },
+    {
+        'id': 'thousand_minutes',
+        'title': '⏱️ 1000 минут',
+        'description': '1000 минут тренировок',
+        'icon': '⏱️',
+        'events': (WORKOUT_ADDED,),
+        'check': lambda ctx: ctx.get('stats', {}).get('total_minutes', 0) >= 1000
+    },
+    {
+        'id': 'weekly_streak',
+        'title': '📆 Недельная серия',
+        'description': '7 тренировок подряд',
+        'icon': '📆',
+        'events': (WORKOUT_ADDED,),
+        'check': lambda ctx: ctx.get('stats', {}).get('longest_streak', 0) >= 7
+    },
+    {
+        'id': 'monthly_streak',
+        'title': '🌟 Месячная серия',
+        'description': '30 тренировок подряд',
+        'icon': '🌟',
+        'events': (WORKOUT_ADDED,),
+        'check': lambda ctx: ctx.get('stats', {}).get('longest_streak', 0) >= 30
+    },
+    {
+        'id': 'questionnaire_complete',
+        'title': '📝 Анкета заполнена',
+        'description': 'Вы заполнили свою анкету',
+        'icon': '📝',
+        'events': (PROFILE_UPDATED,),
+        'check': lambda ctx: ctx.get('profile', {}).get('questionnaire_completed', False)
+    },
+    {
+        'id': 'goal_achieved',
+        'title': '🏆 Цель достигнута!',
+        'description': lambda ctx: f"Достигнут целевой вес {ctx['profile']['goals']['target_weight']}кг",
+        'icon': '🏆',
+        'events': (PROFILE_UPDATED,),
+        'check': _weight_goal_reached
+    },
+    {
+        'id': 'program_started',
+        'title': '📋 Программа начата',
+        'description': 'Вы начали тренировочную программу',
+        'icon': '📋',
+        'events': (PROGRAM_STARTED, PROFILE_UPDATED),
+        'check': lambda ctx: bool(ctx.get('profile', {}).get('current_program'))
+    },
+    {
+        'id': 'feedback_pro',
+        'title': '💬 Эксперт по обратной связи',
+        'description': lambda ctx: f"Оставил {ctx['feedback_count']} отзывов",
+        'icon': '💬',
+        'events': (FEEDBACK_SUBMITTED,),
+        'check': lambda ctx: ctx.get('feedback_count', 0) >= 5
+    }
+]
+
+
+class AchievementEngine:
+    """Открывает достижения по событиям и хранит время их получения"""
+
+    STATE_KEY = 'achievements'
+
+    def __init__(self, storage, rules=ACHIEVEMENT_RULES):
+        self.storage = storage
+        self.rules = rules
+        self._rules_by_event = {}
+        for rule in rules:
+            for event in rule['events']:
+                self._rules_by_event.setdefault(event, []).append(rule)
+
+    def load_state(self, username):
+        """Возвращает сохраненные достижения пользователя или None"""
+        return self.storage.load_state(username, self.STATE_KEY)
+
+    def _evaluate(self, username, rules, context):
+        """Проверяет правила и отмечает новые достижения в состоянии пользователя"""
+        state = self.load_state(username) or {'unlocked': {}, 'backfilled': False}
+        newly_unlocked = []
+        for rule in rules:
+            if rule['id'] in state['unlocked'] or not rule['check'](context):
+                continue
+            description = rule['description']
+            state['unlocked'][rule['id']] = {
+                'unlocked_at': datetime.now().isoformat(),
+                'description': description(context) if callable(description) else description
+            }
+            newly_unlocked.append(rule['id'])
+        return state, newly_unlocked
+
+    def handle_event(self, username, event, context):
+        """Проверяет только правила, зависящие от события; возвращает id новых достижений"""
+        state, newly_unlocked = self._evaluate(username, self._rules_by_event.get(event, []), context)
+        if newly_unlocked:
+            self.storage.save_state(username, self.STATE_KEY, state)
+        return newly_unlocked
+
+    def evaluate_all(self, username, context):
+        """Проверяет все правила (первичное заполнение для существующих пользователей)"""
+        state, _ = self._evaluate(username, self.rules, context)
+        state['backfilled'] = True
+        self.storage.save_state(username, self.STATE_KEY, state)
+        return state
+
+    def get_unlocked(self, state):
+        """Список полученных достижений в порядке реестра"""
+        achievements = []
+        for rule in self.rules:
+            unlocked = state['unlocked'].get(rule['id'])
+            if unlocked:
+                achievements.append({
+                    'id': rule['id'],
+                    'title': rule['title'],
+                    'description': unlocked['description'],
+                    'icon': rule['icon'],
+                    'unlocked': True,
+                    'unlocked_at': unlocked['unlocked_at']
+                })
+        return achievements
@@ -1,18 +1,66 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 from datetime import datetime, timedelta
 import numpy as np
 import os
 import hashlib
 import json
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-import joblib
+import threading
+import time
+from catalog import ProgramCatalog
+from recommender import ProgramMatrix, profile_features, feedback_features, DEFAULT_AGE, DEFAULT_WEIGHT, DEFAULT_HEIGHT
+from storage import create_storage, user_hash
+from caching import LRUCache
+import workout_stats
+import rollups
+import workout_import
+import data_export
+import charts
+from streaks import analyze_streaks
+from achievements import (AchievementEngine, WORKOUT_ADDED, FEEDBACK_SUBMITTED,
+                          PROFILE_UPDATED, PROGRAM_STARTED)
+from workout_log import WORKOUT_COLUMNS
+from retrain_worker import RetrainWorker
+from ring_buffer import TrainingRingBuffer
+from model_bundle import BUNDLE_FILE, LEGACY_FILES, FEATURE_NAMES, save_bundle, load_bundle, migrate_legacy
+from synthetic_data import generate_dataset, parse_priors
+from trainer import fit_forest, grow_forest, replay_sample, resolve_n_jobs
 import warnings
 warnings.filterwarnings('ignore')
 
+# Тип хранилища данных: 'file' (JSON/CSV в user_data) или 'sqlite'
+STORAGE_BACKEND = os.environ.get('FITNESS_STORAGE', 'file')
+# Сколько пользователей держать в кэше разобранной истории тренировок
+WORKOUT_CACHE_SIZE = int(os.environ.get('FITNESS_WORKOUT_CACHE_SIZE', '256'))
+# Кэш готовых рекомендаций: число записей и срок жизни в секундах
+RECOMMENDATION_CACHE_SIZE = int(os.environ.get('FITNESS_RECOMMENDATION_CACHE_SIZE', '1024'))
+RECOMMENDATION_CACHE_TTL = int(os.environ.get('FITNESS_RECOMMENDATION_CACHE_TTL', '3600'))
+# Сколько отрисованных графиков прогресса хранится в памяти
+CHART_CACHE_SIZE = int(os.environ.get('FITNESS_CHART_CACHE_SIZE', '64'))
+# Через сколько секунд невостребованные файлы выгрузки удаляются
+EXPORT_MAX_AGE = int(os.environ.get('FITNESS_EXPORT_MAX_AGE', '3600'))
+# Предел размера выгрузки, МБ: кнопка скачивания Streamlit держит файл в памяти сервера до конца загрузки
+EXPORT_MAX_MB = int(os.environ.get('FITNESS_EXPORT_MAX_MB', '50'))
+# Строк на странице истории тренировок
+HISTORY_PAGE_SIZE = int(os.environ.get('FITNESS_HISTORY_PAGE_SIZE', '10'))
+# До скольких анкет за раз предсказание идет через скомпилированный лес (большие пакеты быстрее в sklearn)
+COMPILED_PREDICT_MAX_ROWS = int(os.environ.get('FITNESS_COMPILED_PREDICT_MAX_ROWS', '256'))
+# Число потоков обучения модели: -1 — все ядра
+TRAIN_N_JOBS = int(os.environ.get('FITNESS_N_JOBS', '-1'))
+# Начальная модель: число синтетических анкет и доли целей (например 'weight_loss=0.3,health=0.2,...')
+INITIAL_SAMPLES = int(os.environ.get('FITNESS_INITIAL_SAMPLES', '2000'))
+INITIAL_CLASS_PRIORS = parse_priors(os.environ.get('FITNESS_INITIAL_CLASS_PRIORS'))
+# Дообучение: 'incremental' — добавление деревьев по новым отзывам, 'full' — всегда полное переобучение
+RETRAIN_MODE = os.environ.get('FITNESS_RETRAIN_MODE', 'incremental')
+# Сколько деревьев добавляется за одно дообучение и сколько их хранится в лесу
+TREES_PER_UPDATE = int(os.environ.get('FITNESS_TREES_PER_UPDATE', '20'))
+FOREST_MAX_TREES = int(os.environ.get('FITNESS_FOREST_MAX_TREES', '100'))
+# Каждое N-е дообучение выполняется полным переобучением
+FULL_REFIT_EVERY = int(os.environ.get('FITNESS_FULL_REFIT_EVERY', '5'))
+# Буфер обучающих примеров: емкость и режим вытеснения ('ring' — последние примеры, 'reservoir' — выборка по всей истории)
+TRAINING_BUFFER_SIZE = int(os.environ.get('FITNESS_TRAINING_BUFFER_SIZE', '5000'))
+TRAINING_BUFFER_MODE = os.environ.get('FITNESS_TRAINING_BUFFER_MODE', 'ring')
+
 # Настройка страницы
 st.set_page_config(
     page_title="💪 Фитнес Помощник",
@@ -161,18 +209,61 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 class SelfLearningFitnessAssistant:
+    # Файлы модели, по изменению которых определяется необходимость перезагрузки
+    MODEL_FILES = (BUNDLE_FILE,)
+    
     def __init__(self):
         self.data_dir = 'user_data'
         self._ensure_data_directory()
+        # Экземпляр общий для всех сессий, поэтому работа с моделью защищена блокировкой
+        self._model_lock = threading.RLock()
+        self._model_signature = None
+        # Пакет модели: скомпилированный лес сразу, объекты sklearn — по первому обращению
+        self.model_bundle = None
+        self.model_manifest = {}
+        # Хранилище пользователей, профилей, тренировок и отзывов
+        self.storage = create_storage(STORAGE_BACKEND, self.data_dir)
+        # Разобранная и отсортированная история тренировок по пользователям
+        self.workout_cache = LRUCache(maxsize=WORKOUT_CACHE_SIZE)
+        # Рекомендации по признакам профиля; сбрасываются при смене модели
+        self.recommendation_cache = LRUCache(maxsize=RECOMMENDATION_CACHE_SIZE, ttl=RECOMMENDATION_CACHE_TTL)
+        # Графики прогресса в PNG по (пользователь, период, день); сбрасываются при изменении журнала
+        self.chart_cache = LRUCache(maxsize=CHART_CACHE_SIZE)
+        # Достижения открываются по событиям и хранятся вместе с данными пользователя
+        self.achievement_engine = AchievementEngine(self.storage)
+        # Обучающие примеры для дообучения (файлы фиксированного размера, запись на место)
+        self.training_buffer = TrainingRingBuffer(self.data_dir, capacity=TRAINING_BUFFER_SIZE,
+                                                  n_features=len(FEATURE_NAMES), mode=TRAINING_BUFFER_MODE)
+        self.training_buffer.migrate_npz(os.path.join(self.data_dir, 'training_data.npz'))
         # Инициализация базы знаний о тренировках
         self.init_training_knowledge_base()
         # Загрузка или создание ML модели
         self.init_ml_model()
+        # Дообучение выполняется в фоновом потоке, запросы пользователей его не ждут
+        self.retrain_worker = RetrainWorker(self.retrain_model_with_feedback)
     
     def _ensure_data_directory(self):
         """Создает папку для данных если её нет"""
         os.makedirs(self.data_dir, exist_ok=True)
     
+    def _get_model_signature(self):
+        """Возвращает отпечаток файлов модели (время изменения и размер)"""
+        signature = []
+        for name in self.MODEL_FILES:
+            try:
+                stat = os.stat(os.path.join(self.data_dir, name))
+                signature.append((name, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append((name, None, None))
+        return tuple(signature)
+    
+    def reload_model_if_changed(self):
+        """Перезагружает модель, если её файлы изменились на диске"""
+        if self._get_model_signature() == self._model_signature:
+            return False
+        self.init_ml_model()
+        return True
+    
     def init_training_knowledge_base(self):
         """Инициализация базы знаний о тренировках для разных целей"""
         
@@ -530,104 +621,97 @@ class SelfLearningFitnessAssistant:
                 }
             ]
         }
+        
+        # Индексы по id, цели, уровню и активностям строятся один раз
+        self.catalog = ProgramCatalog(self.training_programs)
+        # Те же программы в виде массивов для пакетных рекомендаций
+        self.program_matrix = ProgramMatrix(self.catalog)
     
     def init_ml_model(self):
         """Инициализация ML модели для подбора тренировок"""
-        model_path = os.path.join(self.data_dir, 'training_recommender.pkl')
+        with self._model_lock:
+            loaded = self._load_or_train_model()
+            self._model_signature = self._get_model_signature()
+            self.recommendation_cache.clear()
+            return loaded
+    
+    def _load_or_train_model(self):
+        """Загружает сохраненную модель или обучает новую"""
+        bundle_path = os.path.join(self.data_dir, BUNDLE_FILE)
         
-        if os.path.exists(model_path):
-            try:
+        try:
+            if not os.path.exists(bundle_path):
+                # Модель старого формата переносим в единый пакет
+                migrate_legacy(self.data_dir)
+            if os.path.exists(bundle_path):
                 # Загружаем существующую модель
-                self.model = joblib.load(model_path)
-                self.scaler = joblib.load(os.path.join(self.data_dir, 'scaler.pkl'))
-                self.label_encoder = joblib.load(os.path.join(self.data_dir, 'label_encoder.pkl'))
+                self.model_bundle = load_bundle(bundle_path)
+                self.model_manifest = self.model_bundle.manifest
                 return True
-            except Exception as e:
-                # Если ошибка загрузки, создаем новую модель
-                return self.train_initial_model()
-        else:
-            # Создаем и обучаем модель на синтетических данных
+        except Exception as e:
+            # Если ошибка загрузки, создаем новую модель
             return self.train_initial_model()
+        # Создаем и обучаем модель на синтетических данных
+        return self.train_initial_model()
+    
+    @property
+    def model(self):
+        """Лес sklearn текущей модели (sklearn загружается при первом обращении)"""
+        return self.model_bundle.model if self.model_bundle else None
+    
+    @property
+    def scaler(self):
+        """Скейлер текущей модели"""
+        return self.model_bundle.scaler if self.model_bundle else None
+    
+    @property
+    def label_encoder(self):
+        """Кодировщик целей текущей модели"""
+        return self.model_bundle.label_encoder if self.model_bundle else None
+    
+    def _save_model(self, model, scaler, label_encoder, training_samples):
+        """Сохраняет модель единым пакетом и подменяет текущую"""
+        with self._model_lock:
+            version = self.model_manifest.get('version', 0) + 1
+        bundle = save_bundle(os.path.join(self.data_dir, BUNDLE_FILE), model, scaler, label_encoder,
+                             version=version, training_samples=training_samples)
+        with self._model_lock:
+            self.model_bundle = bundle
+            self.model_manifest = bundle.manifest
+            self._model_signature = self._get_model_signature()
+            self.recommendation_cache.clear()
     
     def train_initial_model(self):
         """Обучает начальную модель на синтетических данных"""
+        from sklearn.preprocessing import StandardScaler, LabelEncoder
+        
         try:
-            # Создаем более реалистичные синтетические данные
-            np.random.seed(42)
-            n_samples = 2000
-            
-            # Признаки: возраст, вес, рост, пол (0-жен,1-муж)
-            X = np.zeros((n_samples, 5))  # Теперь 5 признаков включая ИМТ
-            
-            # Генерация реалистичных данных
-            X[:, 0] = np.random.randint(16, 70, n_samples)  # возраст
-            X[:, 1] = np.random.normal(75, 20, n_samples)   # вес
-            X[:, 1] = np.clip(X[:, 1], 40, 150)  # Ограничиваем вес
-            X[:, 2] = np.random.normal(170, 10, n_samples)  # рост
-            X[:, 2] = np.clip(X[:, 2], 150, 210)  # Ограничиваем рост
-            X[:, 3] = np.random.randint(0, 2, n_samples)    # пол
-            
-            # Рассчитываем ИМТ и добавляем как признак
-            height_m = X[:, 2] / 100
-            X[:, 4] = X[:, 1] / (height_m ** 2)  # ИМТ
-            
-            # Цели на основе ИМТ и других факторов (более сложная логика)
-            y = []
-            for i in range(n_samples):
-                age = X[i, 0]
-                bmi = X[i, 4]
-                gender = X[i, 3]
-                
-                if bmi > 28:  # Ожирение
-                    if age > 50:
-                        y.append('health')
-                    else:
-                        y.append('weight_loss')
-                elif bmi < 18.5:  # Недостаточный вес
-                    if gender == 1:  # Мужчины
-                        y.append('muscle_gain')
-                    else:
-                        y.append('health')
-                elif age > 55:  # Пожилые
-                    y.append('flexibility')
-                elif age < 25 and gender == 1:  # Молодые мужчины
-                    y.append('muscle_gain')
-                elif bmi > 24 and bmi <= 28:  # Избыточный вес
-                    y.append('weight_loss')
-                else:
-                    # Случайный выбор между выносливостью и здоровьем
-                    y.append(np.random.choice(['endurance', 'health']))
+            # Синтетические анкеты с целями по правилам (ИМТ, возраст, пол)
+            n_samples = INITIAL_SAMPLES
+            X, y = generate_dataset(n_samples, seed=42, class_priors=INITIAL_CLASS_PRIORS)
             
             # Кодируем цели
-            self.label_encoder = LabelEncoder()
-            y_encoded = self.label_encoder.fit_transform(y)
+            label_encoder = LabelEncoder()
+            y_encoded = label_encoder.fit_transform(y)
             
             # Масштабируем признаки
-            self.scaler = StandardScaler()
-            X_scaled = self.scaler.fit_transform(X)
-            
-            # Обучаем модель с настройками для инкрементального обучения
-            self.model = RandomForestClassifier(
-                n_estimators=100, 
-                max_depth=10,
-                min_samples_split=5,
-                warm_start=True,  # Для инкрементального обучения
-                random_state=42,
-                class_weight='balanced'
-            )
-            self.model.fit(X_scaled, y_encoded)
+            scaler = StandardScaler()
+            X_scaled = scaler.fit_transform(X)
+            
+            # Обучаем модель на всех доступных ядрах
+            model, train_seconds = fit_forest(X_scaled, y_encoded, n_jobs=TRAIN_N_JOBS)
             
-            # Сохраняем модель и скейлер
-            joblib.dump(self.model, os.path.join(self.data_dir, 'training_recommender.pkl'))
-            joblib.dump(self.scaler, os.path.join(self.data_dir, 'scaler.pkl'))
-            joblib.dump(self.label_encoder, os.path.join(self.data_dir, 'label_encoder.pkl'))
+            # Сохраняем модель, скейлер и кодировщик одним пакетом
+            self._save_model(model, scaler, label_encoder, training_samples=n_samples)
             
             # Сохраняем информацию о начальной модели
             model_info = {
                 'initial_training_date': datetime.now().isoformat(),
                 'initial_samples': n_samples,
-                'feature_names': ['age', 'weight', 'height', 'gender', 'bmi'],
-                'classes': list(self.label_encoder.classes_)
+                'train_seconds': round(train_seconds, 3),
+                'n_jobs': resolve_n_jobs(TRAIN_N_JOBS),
+                'feature_names': FEATURE_NAMES,
+                'classes': list(label_encoder.classes_)
             }
             with open(os.path.join(self.data_dir, 'model_info.json'), 'w') as f:
                 json.dump(model_info, f, indent=2)
@@ -640,8 +724,6 @@ class SelfLearningFitnessAssistant:
     def collect_feedback(self, username, program_id, rating, user_goal, actual_goal=None, comment=''):
         """Собирает обратную связь от пользователя по рекомендации"""
         try:
-            feedback_file = os.path.join(self.data_dir, 'user_feedback.csv')
-            
             # Загружаем профиль пользователя для получения его данных
             profile = self.load_user_profile(username)
             personal_info = profile.get('personal_info', {})
@@ -655,7 +737,7 @@ class SelfLearningFitnessAssistant:
             # Создаем запись обратной связи
             feedback_data = {
                 'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'user_id': hashlib.md5(username.encode()).hexdigest()[:8],  # Анонимный ID
+                'user_id': user_hash(username),  # Анонимный ID
                 'user_age': personal_info.get('age'),
                 'user_weight': personal_info.get('weight'),
                 'user_height': personal_info.get('height'),
@@ -668,22 +750,14 @@ class SelfLearningFitnessAssistant:
                 'user_comment': comment
             }
             
-            # Сохраняем в CSV
-            df = pd.DataFrame([feedback_data])
-            if os.path.exists(feedback_file):
-                existing_df = pd.read_csv(feedback_file)
-                # Проверяем, не дублируется ли отзыв
-                recent_feedback = existing_df[
-                    (existing_df['user_id'] == feedback_data['user_id']) & 
-                    (existing_df['program_id'] == program_id) &
-                    (pd.to_datetime(existing_df['timestamp']) > pd.Timestamp.now() - pd.Timedelta(hours=1))
-                ]
-                if len(recent_feedback) == 0:
-                    df.to_csv(feedback_file, mode='a', header=False, index=False)
-                else:
-                    return True, "Вы уже оставляли отзыв по этой программе недавно."
-            else:
-                df.to_csv(feedback_file, index=False)
+            # Проверяем, не дублируется ли отзыв
+            since = pd.Timestamp.now() - pd.Timedelta(hours=1)
+            if self.storage.has_recent_feedback(feedback_data['user_id'], program_id, since):
+                return True, "Вы уже оставляли отзыв по этой программе недавно."
+            self.storage.append_feedback(feedback_data)
+            self.achievement_engine.handle_event(username, FEEDBACK_SUBMITTED, {
+                'feedback_count': self.storage.count_feedback(feedback_data['user_id'])
+            })
             
             # Проверяем, нужно ли запустить дообучение
             self._check_retraining_needed()
@@ -695,138 +769,150 @@ class SelfLearningFitnessAssistant:
     def _check_retraining_needed(self):
         """Проверяет, нужно ли запустить дообучение модели"""
         try:
-            feedback_file = os.path.join(self.data_dir, 'user_feedback.csv')
-            if not os.path.exists(feedback_file):
-                return
-            
-            feedback_df = pd.read_csv(feedback_file)
-            
             # Если накопилось достаточно новых отзывов (например, 30)
-            if len(feedback_df) >= 30:
+            if self.storage.count_feedback() >= 30:
                 # Проверяем, когда последний раз дообучали модель
-                retrain_log_path = os.path.join(self.data_dir, 'retraining_log.json')
-                if os.path.exists(retrain_log_path):
-                    with open(retrain_log_path, 'r') as f:
-                        log = json.load(f)
-                    last_retrain = pd.Timestamp(log[-1]['retrain_date']) if log else pd.Timestamp.min
-                else:
-                    last_retrain = pd.Timestamp.min
+                log = self._read_retraining_log()
                 
-                # Если прошло больше 3 дней с последнего дообучения
-                if (pd.Timestamp.now() - last_retrain).days >= 3:
-                    # Автоматически запускаем дообучение
-                    success, message = self.retrain_model_with_feedback()
-                    if success:
-                        st.session_state.auto_retrain_message = message
+                # Если дообучения еще не было или прошло больше 3 дней с последнего
+                if not log or (pd.Timestamp.now() - pd.Timestamp(log[-1]['retrain_date'])).days >= 3:
+                    # Ставим дообучение в очередь фонового потока
+                    self.retrain_worker.submit(reason='auto')
         except Exception as e:
             pass
     
+    def _read_retraining_log(self):
+        """Журнал дообучений"""
+        log_path = os.path.join(self.data_dir, 'retraining_log.json')
+        if os.path.exists(log_path):
+            with open(log_path, 'r') as f:
+                return json.load(f)
+        return []
+    
     def retrain_model_with_feedback(self, force_retrain=False):
         """Дообучает модель на основе накопленных отзывов пользователей"""
+        from sklearn.preprocessing import StandardScaler
+        
+        started = time.perf_counter()
         try:
-            feedback_file = os.path.join(self.data_dir, 'user_feedback.csv')
-            if not os.path.exists(feedback_file):
-                return False, "Файл с отзывами не найден."
-            
-            feedback_df = pd.read_csv(feedback_file)
-            
-            # Фильтруем валидные записи
-            valid_feedback = feedback_df.dropna(subset=['user_age', 'user_weight', 'user_height', 'user_gender', 'user_rating'])
-            
-            if len(valid_feedback) < 20 and not force_retrain:
-                return False, f"Недостаточно данных для дообучения (только {len(valid_feedback)} записей). Нужно минимум 20."
-            
-            # Разделяем на положительные и все отзывы
-            positive_feedback = valid_feedback[valid_feedback['user_rating'] >= 4]
-            all_feedback = valid_feedback
-            
-            # Используем все отзывы, но взвешиваем по рейтингу
-            weights = all_feedback['user_rating'] / 5.0  # Веса от 0.2 до 1.0
-            
-            # Подготовка признаков (теперь 5 признаков)
-            X_new = all_feedback[['user_age', 'user_weight', 'user_height', 'user_gender']].values
-            
-            # Добавляем ИМТ как признак
-            heights_m = all_feedback['user_height'] / 100
-            bmis = all_feedback['user_weight'] / (heights_m ** 2)
-            X_new = np.hstack([X_new, bmis.values.reshape(-1, 1)])
-            
-            # Используем actual_user_goal если есть, иначе recommended_goal
-            y_new = all_feedback['actual_user_goal'].fillna(all_feedback['recommended_goal']).values
+            log = self._read_retraining_log()
+            last_entry = log[-1] if log else {}
+            
+            # Водяной знак: позиция в журнале отзывов, до которой отзывы уже попали в обучающую выборку
+            watermark = last_entry.get('feedback_watermark', 0)
+            # Журнал без водяного знака хранил только число учтенных отзывов
+            skip = 0 if 'feedback_watermark' in last_entry else last_entry.get('total_feedback', 0)
+            if skip > self.storage.count_feedback():
+                # Отзывы очищали: начинаем учет заново
+                skip = 0
+            
+            # Читаем только новые отзывы, блоками: в памяти остаются лишь их признаки
+            X_parts, y_parts = [], []
+            positive_count = 0
+            new_watermark = watermark
+            for chunk, new_watermark in self.storage.iter_feedback(watermark):
+                if skip:
+                    dropped = min(skip, len(chunk))
+                    chunk = chunk.iloc[dropped:]
+                    skip -= dropped
+                X_chunk, y_chunk, ratings = feedback_features(chunk)
+                X_parts.append(X_chunk)
+                y_parts.append(y_chunk)
+                positive_count += int((ratings >= 4).sum())
+            X_new = np.vstack(X_parts) if X_parts else np.empty((0, len(FEATURE_NAMES)))
+            y_new = np.concatenate(y_parts) if y_parts else np.empty(0, dtype=str)
+            
+            if len(X_new) < 20 and not force_retrain:
+                return False, f"Недостаточно новых данных для дообучения (только {len(X_new)} записей). Нужно минимум 20."
             
             # Загружаем текущую модель если еще не загружена
-            if not hasattr(self, 'model'):
+            if self.model_bundle is None:
                 self.init_ml_model()
+            bundle = self.model_bundle
+            
+            buffer = self.training_buffer
+            if len(buffer) + len(X_new) == 0:
+                return False, "Отзывы не найдены."
             
-            # 1. Полное переобучение на всех данных (старых + новых)
-            # Для этого нам нужны старые данные
-            old_data_path = os.path.join(self.data_dir, 'training_data.npz')
+            # Полное переобучение — по запросу, без новых отзывов и раз в FULL_REFIT_EVERY дообучений
+            incremental_in_row = 0
+            for entry in reversed(log):
+                if entry.get('mode') != 'incremental':
+                    break
+                incremental_in_row += 1
+            full_refit = (
+                RETRAIN_MODE == 'full'
+                or force_retrain
+                or len(X_new) == 0
+                or incremental_in_row + 1 >= FULL_REFIT_EVERY
+            )
             
-            if os.path.exists(old_data_path):
-                # Загружаем старые данные
-                old_data = np.load(old_data_path)
-                X_old = old_data['X']
-                y_old = old_data['y']
+            model = None
+            if not full_refit:
+                # Новые деревья учатся на новых отзывах и случайной выборке из буфера;
+                # скейлер не меняется, чтобы старые деревья видели признаки в том же масштабе
+                # Выборка берется из буфера до записи новых отзывов
+                X_old, y_old = buffer.data()
+                X_replay, y_replay = replay_sample(X_old, y_old, len(X_new), np.random.default_rng(len(log)))
+                X_batch = bundle.scaler.transform(np.vstack([X_replay, X_new]))
+                y_batch = bundle.label_encoder.transform(np.concatenate([y_replay, y_new]))
+                model, train_seconds = grow_forest(
+                    bundle.model, X_batch, y_batch,
+                    n_new_trees=TREES_PER_UPDATE, max_trees=FOREST_MAX_TREES,
+                    n_jobs=TRAIN_N_JOBS, random_state=len(log)
+                )
+                scaler = bundle.scaler
+                mode = 'incremental'
+                samples_used = len(X_batch)
+            
+            if model is None:
+                # Полное переобучение (или в пачке представлены не все цели) на буфере вместе с новыми отзывами;
+                # сам буфер меняется только после сохранения модели и журнала
+                X_combined, y_combined = buffer.preview(X_new, y_new)
+                # Масштабируем данные новым скейлером: текущим пользуются другие сессии
+                scaler = StandardScaler()
+                X_scaled = scaler.fit_transform(X_combined)
                 
-                # Объединяем старые и новые данные
-                X_combined = np.vstack([X_old, X_new])
-                y_combined = np.concatenate([y_old, y_new])
+                # Кодируем цели
+                y_encoded = bundle.label_encoder.transform(y_combined)
                 
-                # Ограничиваем общий размер данных (максимум 5000 примеров)
-                if len(X_combined) > 5000:
-                    X_combined = X_combined[-5000:]
-                    y_combined = y_combined[-5000:]
-            else:
-                # Только новые данные
-                X_combined = X_new
-                y_combined = y_new
-            
-            # Сохраняем объединенные данные
-            np.savez(old_data_path, X=X_combined, y=y_combined)
-            
-            # Масштабируем данные
-            X_scaled = self.scaler.fit_transform(X_combined)
+                # Переобучаем модель с нуля на всех доступных ядрах
+                model, train_seconds = fit_forest(X_scaled, y_encoded, n_jobs=TRAIN_N_JOBS)
+                mode = 'full'
+                samples_used = len(X_combined)
             
-            # Кодируем цели
-            y_encoded = self.label_encoder.transform(y_combined)
-            
-            # Переобучаем модель с нуля
-            self.model = RandomForestClassifier(
-                n_estimators=100, 
-                max_depth=10,
-                min_samples_split=5,
-                warm_start=True,
-                random_state=42,
-                class_weight='balanced'
-            )
-            self.model.fit(X_scaled, y_encoded)
-            
-            # Сохраняем обновленную модель
-            joblib.dump(self.model, os.path.join(self.data_dir, 'training_recommender.pkl'))
-            joblib.dump(self.scaler, os.path.join(self.data_dir, 'scaler.pkl'))
-            joblib.dump(self.label_encoder, os.path.join(self.data_dir, 'label_encoder.pkl'))
+            # Сохраняем новую модель и подменяем ею текущую
+            self._save_model(model, scaler, bundle.label_encoder, training_samples=samples_used)
             
             # Логируем событие дообучения
             log_entry = {
                 'retrain_date': datetime.now().isoformat(),
-                'samples_used': len(X_combined),
+                'mode': mode,
+                'trees': len(model.estimators_),
+                'samples_used': samples_used,
                 'new_samples': len(X_new),
-                'positive_feedback': len(positive_feedback),
-                'total_feedback': len(feedback_df)
+                'positive_feedback': positive_count,
+                'total_feedback': self.storage.count_feedback(),
+                'feedback_watermark': new_watermark,
+                'n_jobs': resolve_n_jobs(TRAIN_N_JOBS),
+                'train_seconds': round(train_seconds, 3),
+                'retrain_seconds': round(time.perf_counter() - started, 3)
             }
             
-            log_path = os.path.join(self.data_dir, 'retraining_log.json')
-            if os.path.exists(log_path):
-                with open(log_path, 'r') as f:
-                    log = json.load(f)
-            else:
-                log = []
-            
             log.append(log_entry)
-            with open(log_path, 'w') as f:
+            # Журнал пишется во временный файл и подменяется атомарно: чтение не увидит недописанный JSON
+            log_path = os.path.join(self.data_dir, 'retraining_log.json')
+            with open(f'{log_path}.tmp', 'w') as f:
                 json.dump(log, f, indent=2)
+            os.replace(f'{log_path}.tmp', log_path)
             
-            return True, f"✅ Модель успешно дообучена! Использовано {len(X_combined)} примеров ({len(X_new)} новых)."
+            # Новые отзывы дописываются в буфер на место вытесняемых примеров только после того, как водяной знак
+            # сохранен: при сбое раньше следующее дообучение прочитает их снова, но в буфер они попадут один раз
+            buffer.append(X_new, y_new)
+            
+            if mode == 'incremental':
+                return True, f"✅ Модель успешно дообучена! Добавлено {TREES_PER_UPDATE} деревьев по {len(X_new)} новым отзывам."
+            return True, f"✅ Модель успешно дообучена! Использовано {samples_used} примеров ({len(X_new)} новых)."
         
         except Exception as e:
             return False, f"❌ Ошибка при дообучении модели: {e}"
@@ -834,10 +920,10 @@ class SelfLearningFitnessAssistant:
     def get_model_info(self):
         """Возвращает информацию о текущей модели"""
         info = {
-            'has_model': hasattr(self, 'model') and self.model is not None,
-            'model_type': type(self.model).__name__ if hasattr(self, 'model') else 'None',
-            'feature_count': self.model.n_features_in_ if hasattr(self, 'model') and hasattr(self.model, 'n_features_in_') else 0,
-            'classes': list(self.label_encoder.classes_) if hasattr(self, 'label_encoder') else []
+            'has_model': self.model_bundle is not None,
+            'model_type': self.model_manifest.get('model_type', 'None'),
+            'feature_count': len(self.model_manifest.get('feature_names', [])),
+            'classes': list(self.model_manifest.get('classes', []))
         }
         
         # Читаем дополнительную информацию из файлов
@@ -850,102 +936,121 @@ class SelfLearningFitnessAssistant:
         except:
             pass
         
+        # Сведения о текущей версии из манифеста пакета
+        manifest = self.model_manifest
+        info.update({
+            'version': manifest.get('version'),
+            'trained_at': manifest.get('created_at'),
+            'training_samples': manifest.get('training_samples'),
+            'content_hash': manifest.get('hash')
+        })
+        
         return info
     
+    def recommend_batch(self, profiles, top_k=3):
+        """Рекомендации для многих профилей сразу: одна матрица признаков и один вызов модели.
+        
+        Возвращает для каждого профиля словарь с предсказанной целью, итоговой целью и id программ.
+        """
+        X = profile_features(profiles)
+        # Результат зависит только от признаков, цели, активностей и версии модели
+        model_version = self.model_manifest.get('hash')
+        keys = [
+            (tuple(np.round(X[i], 1)), profile.get('goals', {}).get('primary_goal'),
+             tuple(sorted(profile.get('preferred_activities', []))), top_k)
+            for i, profile in enumerate(profiles)
+        ]
+        results = [self.recommendation_cache.get(key, model_version) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            computed = self._recommend_uncached([profiles[i] for i in missing], X[missing], top_k)
+            for i, result in zip(missing, computed):
+                self.recommendation_cache.put(keys[i], result, model_version)
+                results[i] = result
+        return [dict(result, program_ids=list(result['program_ids'])) for result in results]
+    
+    def _recommend_uncached(self, profiles, X, top_k):
+        """Рекомендации без кэша (см. recommend_batch)"""
+        matrix = self.program_matrix
+        primary_goals = [profile.get('goals', {}).get('primary_goal') for profile in profiles]
+        
+        with self._model_lock:
+            bundle = self.model_bundle
+        if bundle is None:
+            # Без модели используется выбранная цель, а если программ для неё нет — похудение
+            predicted_goals = np.full(len(profiles), 'weight_loss', dtype=object)
+            predicted = [None] * len(profiles)
+        else:
+            # Пакет содержит согласованный набор лес/скейлер/кодировщик
+            if len(X) <= COMPILED_PREDICT_MAX_ROWS:
+                # Для нескольких анкет плоские массивы быстрее вызова sklearn (скейлер уже внутри)
+                predicted_encoded = bundle.compiled.predict(X)
+            else:
+                predicted_encoded = bundle.model.predict(bundle.scaler.transform(X))
+            predicted_goals = bundle.decode(predicted_encoded)
+            predicted = [str(goal) for goal in predicted_goals]
+        
+        # Цель пользователя, если для неё есть программы, иначе предсказание модели
+        primary_codes = matrix.goal_codes(primary_goals)
+        has_programs = (primary_codes >= 0) & matrix.goal_has_programs[primary_codes]
+        goal_codes = np.where(has_programs, primary_codes, matrix.goal_codes(predicted_goals))
+        
+        preferences = matrix.preference_mask([profile.get('preferred_activities', []) for profile in profiles])
+        ranked = matrix.rank(goal_codes, preferences, top_k=top_k)
+        
+        return [
+            {
+                'predicted_goal': predicted[i],
+                'goal': matrix.goals[goal_codes[i]] if goal_codes[i] >= 0 else None,
+                'program_ids': ranked[i]
+            }
+            for i in range(len(profiles))
+        ]
+    
+    def recommend_all_users(self, top_k=3):
+        """Рекомендации для всех пользователей (для ночного пересчета)"""
+        usernames = self.storage.list_users()
+        profiles = [self.load_user_profile(username) for username in usernames]
+        results = self.recommend_batch(profiles, top_k=top_k)
+        return {username: result['program_ids'] for username, result in zip(usernames, results)}
+    
     def recommend_programs_based_on_profile(self, user_profile, display_feedback=True):
         """Рекомендует программы тренировок на основе профиля пользователя с системой обратной связи"""
         try:
-            personal_info = user_profile.get('personal_info', {})
-            goals = user_profile.get('goals', {})
-            preferred_activities = user_profile.get('preferred_activities', [])
-            
-            # Извлекаем данные для ML модели
-            age = personal_info.get('age', 30)
-            weight = personal_info.get('weight', 70)
-            height = personal_info.get('height', 170)
-            gender = 0 if personal_info.get('gender') == 'Женский' else 1
-            
-            # Рассчитываем ИМТ
-            height_m = height / 100
-            bmi = weight / (height_m ** 2)
-            
-            # Подготавливаем признаки для модели (5 признаков)
-            X = np.array([[age, weight, height, gender, bmi]])
+            result = self.recommend_batch([user_profile])[0]
             
             # Проверяем, есть ли модель
-            if not hasattr(self, 'model') or self.model is None:
+            if result['predicted_goal'] is None:
                 st.warning("ML модель не загружена. Используются рекомендации по выбранной цели.")
-                primary_goal = goals.get('primary_goal', 'weight_loss')
-                final_goal = primary_goal if primary_goal in self.training_programs else 'weight_loss'
-                recommended_programs = self.training_programs.get(final_goal, [])[:3]
-            else:
-                # Масштабируем признаки
-                X_scaled = self.scaler.transform(X)
-                
-                # Предсказываем цель
-                predicted_goal_encoded = self.model.predict(X_scaled)[0]
-                predicted_goal = self.label_encoder.inverse_transform([predicted_goal_encoded])[0]
-                
-                # Определяем финальную цель (предпочтение пользователя или предсказание модели)
-                primary_goal = goals.get('primary_goal', predicted_goal)
-                
-                # Если пользователь выбрал цель, используем её, иначе используем предсказание модели
-                # Но также можем учитывать предсказание модели как рекомендацию
-                final_goal = primary_goal
-                
-                # Получаем программы для цели
-                recommended_programs = self.training_programs.get(final_goal, [])
-                
-                # Если программ для выбранной цели нет, используем предсказание модели
-                if not recommended_programs:
-                    final_goal = predicted_goal
-                    recommended_programs = self.training_programs.get(final_goal, [])
-                
+            elif display_feedback:
                 # Добавляем объяснение рекомендации
-                if display_feedback:
-                    goal_info = self.goals.get(predicted_goal, {})
-                    with st.expander("🤖 Как ИИ сделал эту рекомендацию?", expanded=False):
-                        st.write(f"**На основе ваших данных:**")
-                        st.write(f"- Возраст: {age} лет")
-                        st.write(f"- Рост: {height} см, Вес: {weight} кг")
-                        st.write(f"- ИМТ: {bmi:.1f} ({self.get_bmi_category(bmi)})")
-                        st.write(f"**Модель рекомендует:** {goal_info.get('name', predicted_goal)}")
-                        st.write(f"**Ваш выбор:** {self.goals.get(primary_goal, {}).get('name', primary_goal)}")
-            
-            # Фильтруем по предпочитаемым активностям
-            if preferred_activities and recommended_programs:
-                filtered_programs = []
-                for program in recommended_programs:
-                    program_activities = program.get('activities', [])
-                    # Проверяем, есть ли пересечение с предпочитаемыми активностями
-                    if any(activity in preferred_activities for activity in program_activities):
-                        filtered_programs.append(program)
-                
-                if filtered_programs:
-                    recommended_programs = filtered_programs[:3]
-            
-            # Ограничиваем количество программ
-            recommended_programs = recommended_programs[:3]
-            
-            return recommended_programs
+                personal_info = user_profile.get('personal_info', {})
+                age = personal_info.get('age', DEFAULT_AGE)
+                weight = personal_info.get('weight', DEFAULT_WEIGHT)
+                height = personal_info.get('height', DEFAULT_HEIGHT)
+                bmi = weight / ((height / 100) ** 2)
+                predicted_goal = result['predicted_goal']
+                primary_goal = user_profile.get('goals', {}).get('primary_goal', predicted_goal)
+                goal_info = self.goals.get(predicted_goal, {})
+                with st.expander("🤖 Как ИИ сделал эту рекомендацию?", expanded=False):
+                    st.write(f"**На основе ваших данных:**")
+                    st.write(f"- Возраст: {age} лет")
+                    st.write(f"- Рост: {height} см, Вес: {weight} кг")
+                    st.write(f"- ИМТ: {bmi:.1f} ({self.get_bmi_category(bmi)})")
+                    st.write(f"**Модель рекомендует:** {goal_info.get('name', predicted_goal)}")
+                    st.write(f"**Ваш выбор:** {self.goals.get(primary_goal, {}).get('name', primary_goal)}")
+            
+            return [self.catalog.get(program_id) for program_id in result['program_ids']]
             
         except Exception as e:
             # В случае ошибки возвращаем программы по умолчанию
             st.warning(f"Используются рекомендации по умолчанию. Ошибка: {str(e)[:100]}")
             primary_goal = user_profile.get('goals', {}).get('primary_goal', 'weight_loss')
-            return self.training_programs.get(primary_goal, self.training_programs['weight_loss'])[:3]
+            return self.catalog.by_goal.get(primary_goal, self.catalog.for_goal('weight_loss'))[:3]
     
     def get_exercises_for_program(self, program_id, day=None):
         """Возвращает упражнения для конкретной программы и дня"""
-        # Находим программу
-        program = None
-        for goal_programs in self.training_programs.values():
-            for p in goal_programs:
-                if p['id'] == program_id:
-                    program = p
-                    break
-            if program:
-                break
+        program = self.catalog.get(program_id)
         
         if not program:
             return {}
@@ -956,26 +1061,14 @@ class SelfLearningFitnessAssistant:
                 return program['workouts'][day]
             elif program['workouts']:
                 # Возвращаем первую тренировку, если день не указан
-                first_day = list(program['workouts'].keys())[0]
+                first_day = self.catalog.get_days(program_id)[0]
                 return program['workouts'][first_day]
         
         return {}
     
     def get_all_workout_days(self, program_id):
         """Возвращает все дни тренировок для программы"""
-        program = None
-        for goal_programs in self.training_programs.values():
-            for p in goal_programs:
-                if p['id'] == program_id:
-                    program = p
-                    break
-            if program:
-                break
-        
-        if not program or 'workouts' not in program:
-            return []
-        
-        return list(program['workouts'].keys())
+        return list(self.catalog.get_days(program_id))
     
     def calculate_calories_needed(self, user_profile):
         """Рассчитывает суточную потребность в калориях"""
@@ -1015,36 +1108,13 @@ class SelfLearningFitnessAssistant:
         
         return int(calories), int(tdee)
     
-    def get_user_filename(self, username, file_type='workouts'):
-        """Генерирует имя файла для пользователя"""
-        user_hash = hashlib.md5(username.encode()).hexdigest()[:8]
-        return os.path.join(self.data_dir, f'{file_type}_{user_hash}.csv')
-    
-    def get_user_profile_filename(self, username):
-        """Генерирует имя файла для профиля пользователя"""
-        user_hash = hashlib.md5(username.encode()).hexdigest()[:8]
-        return os.path.join(self.data_dir, f'profile_{user_hash}.json')
-    
     # Система аутентификации
     def register_user(self, username, password):
         """Регистрация нового пользователя"""
         try:
-            users_file = os.path.join(self.data_dir, 'users.json')
-            
-            if os.path.exists(users_file):
-                with open(users_file, 'r') as f:
-                    users = json.load(f)
-            else:
-                users = {}
-            
-            if username in users:
-                return False, "Пользователь с таким именем уже существует"
-            
             password_hash = hashlib.sha256(password.encode()).hexdigest()
-            users[username] = password_hash
-            
-            with open(users_file, 'w') as f:
-                json.dump(users, f)
+            if not self.storage.create_user(username, password_hash):
+                return False, "Пользователь с таким именем уже существует"
             
             # Создаем профиль
             profile = {
@@ -1067,17 +1137,10 @@ class SelfLearningFitnessAssistant:
     def login_user(self, username, password):
         """Авторизация пользователя"""
         try:
-            users_file = os.path.join(self.data_dir, 'users.json')
-            
-            if not os.path.exists(users_file):
-                return False, "Пользователь не найден"
-            
-            with open(users_file, 'r') as f:
-                users = json.load(f)
-            
+            stored_hash = self.storage.get_password_hash(username)
             password_hash = hashlib.sha256(password.encode()).hexdigest()
             
-            if username in users and users[username] == password_hash:
+            if stored_hash is not None and stored_hash == password_hash:
                 return True, "Вход успешен"
             else:
                 return False, "Неверное имя пользователя или пароль"
@@ -1088,9 +1151,7 @@ class SelfLearningFitnessAssistant:
     def save_user_profile(self, username, profile):
         """Сохраняет профиль пользователя"""
         try:
-            filename = self.get_user_profile_filename(username)
-            with open(filename, 'w') as f:
-                json.dump(profile, f, indent=2)
+            self.storage.save_profile(username, profile)
             return True
         except Exception as e:
             return False
@@ -1098,10 +1159,8 @@ class SelfLearningFitnessAssistant:
     def load_user_profile(self, username):
         """Загружает профиль пользователя"""
         try:
-            filename = self.get_user_profile_filename(username)
-            if os.path.exists(filename):
-                with open(filename, 'r') as f:
-                    profile = json.load(f)
+            profile = self.storage.load_profile(username)
+            if profile is not None:
                 # Проверяем структуру профиля
                 if 'questionnaire_completed' not in profile:
                     profile['questionnaire_completed'] = False
@@ -1150,14 +1209,20 @@ class SelfLearningFitnessAssistant:
         profile['bmi'] = round(bmi, 1)
         profile['bmi_category'] = self.get_bmi_category(bmi)
         
-        return self.save_user_profile(username, profile)
+        saved = self.save_user_profile(username, profile)
+        if saved:
+            self.achievement_engine.handle_event(username, PROFILE_UPDATED, {'profile': profile})
+        return saved
     
     def set_current_program(self, username, program_id):
         """Устанавливает текущую программу для пользователя"""
         profile = self.load_user_profile(username)
         profile['current_program'] = program_id
         profile['program_start_date'] = datetime.now().isoformat()
-        return self.save_user_profile(username, profile)
+        saved = self.save_user_profile(username, profile)
+        if saved:
+            self.achievement_engine.handle_event(username, PROGRAM_STARTED, {'profile': profile})
+        return saved
     
     def get_bmi_category(self, bmi):
         """Определяет категорию ИМТ"""
@@ -1183,185 +1248,208 @@ class SelfLearningFitnessAssistant:
                 'day': day if day else ''
             }
             
-            df = pd.DataFrame([new_data])
-            filename = self.get_user_filename(username)
-            
-            if os.path.exists(filename):
-                existing_df = pd.read_csv(filename)
-                updated_df = pd.concat([existing_df, df], ignore_index=True)
-            else:
-                updated_df = df
-                
-            updated_df.to_csv(filename, index=False)
+            # Дописываем одну строку вместо перезаписи всей истории
+            version_before = self._workouts_version(username)
+            self.storage.append_workout(username, new_data)
+            self.workout_cache.pop(username)
+            stats = self._update_workout_stats(username, new_data, version_before)
+            self._update_workout_rollups(username, new_data, version_before)
+            self.achievement_engine.handle_event(username, WORKOUT_ADDED, {
+                'stats': workout_stats.summarize(stats, self._recent_day_rollups(username))
+            })
             return True, "Тренировка успешно сохранена! 💪"
             
         except Exception as e:
             return False, f"Ошибка при сохранении: {e}"
     
+    def import_workouts(self, username, data, filename, progress=None):
+        """Импортирует тренировки из CSV/JSON: проверка целыми колонками и одна пакетная запись.
+
+        Возвращает (успех, сообщение, отчет об ошибках); progress(доля, текст) вызывается между этапами.
+        """
+        report = pd.DataFrame(columns=['row', 'errors'])
+        progress = progress or (lambda fraction, text: None)
+        try:
+            progress(0.1, "Чтение файла...")
+            raw = workout_import.read_upload(data, filename)
+            progress(0.3, f"Проверка {len(raw)} строк...")
+            accepted, report = workout_import.validate_workouts(raw)
+            if accepted.empty:
+                return False, "Нет ни одной корректной тренировки для импорта.", report
+            
+            progress(0.5, f"Сохранение {len(accepted)} тренировок...")
+            self.storage.append_workouts(username, accepted)
+            self.workout_cache.pop(username)
+            
+            # Сводки и таблицы по дням/неделям/месяцам пересчитываются один раз на весь импорт
+            progress(0.8, "Пересчет статистики...")
+            stats = self.rebuild_workout_stats(username)
+            self.rebuild_workout_rollups(username)
+            self.achievement_engine.handle_event(username, WORKOUT_ADDED, {
+                'stats': workout_stats.summarize(stats, self._recent_day_rollups(username))
+            })
+            progress(1.0, "Готово")
+            return True, f"Импортировано тренировок: {len(accepted)}, отклонено строк: {len(report)}.", report
+        except Exception as e:
+            return False, f"Ошибка импорта: {e}", report
+    
+    def export_user_data(self, username, export_format):
+        """Выгружает профиль, тренировки и отзывы пользователя во временный файл; возвращает (успех, путь или сообщение)"""
+        try:
+            data_export.remove_stale_exports(EXPORT_MAX_AGE)
+            return True, data_export.export_user_data(self.storage, username, user_hash(username), export_format,
+                                                      max_bytes=EXPORT_MAX_MB * 2 ** 20)
+        except Exception as e:
+            return False, f"Ошибка экспорта: {e}"
+    
     def get_all_workouts(self, username):
         """Возвращает все тренировки пользователя"""
-        filename = self.get_user_filename(username)
-        if os.path.exists(filename):
-            df = pd.read_csv(filename)
+        # История разбирается один раз на версию данных; наружу отдаем копию
+        version = self.storage.workouts_version(username)
+        df = self.workout_cache.get(username, version)
+        if df is None:
+            df = self.storage.read_workouts(username)
             if not df.empty:
-                df['date'] = pd.to_datetime(df['date'])
-                return df.sort_values('date', ascending=False)
-        return pd.DataFrame(columns=['date', 'workout_type', 'duration', 'intensity', 'notes', 'program_id', 'day'])
+                df = df.sort_values('date', ascending=False)
+            else:
+                df = pd.DataFrame(columns=WORKOUT_COLUMNS)
+            self.workout_cache.put(username, df, version)
+        return df.copy()
+    
+    def query_workouts(self, username, start=None, end=None, limit=HISTORY_PAGE_SIZE, cursor=None):
+        """Страница истории от новых тренировок к старым за [start, end) без чтения всего журнала"""
+        return self.storage.query_workouts(username, start, end, limit, cursor)
+    
+    def get_activity_chart(self, username, range_days=None):
+        """График активности за период: (PNG, детализация) или None, если тренировок в периоде нет"""
+        version = self.storage.workouts_version(username)
+        key = (username, range_days, datetime.now().date())
+        chart = self.chart_cache.get(key, version)
+        if chart is None:
+            span = self.get_rollup_span(username)
+            if span is not None:
+                start, end, grain = charts.chart_window(span, range_days)
+                # Недельные и месячные значения берутся из готовых сводок; крайние столбцы охватывают период целиком
+                series = self.get_rollups(username, grain, start, end)
+                if not series.empty:
+                    chart = charts.render_activity_png(series, grain), grain
+            self.chart_cache.put(key, chart, version)
+        return chart
+    
+    def _workouts_version(self, username):
+        """Версия журнала тренировок в виде, пригодном для JSON"""
+        version = self.storage.workouts_version(username)
+        return list(version) if version is not None else None
+    
+    def _update_workout_stats(self, username, workout, version_before):
+        """Обновляет сохраненную сводку одной тренировкой"""
+        stats = self.storage.load_state(username, 'workout_stats')
+        # Если сводка отстала от журнала, проще пересчитать её полностью
+        if stats is None or stats.get('needs_rebuild') or stats.get('source_version') != version_before:
+            return self.rebuild_workout_stats(username)
+        workout_stats.apply_workout(stats, workout['date'], workout['duration'], workout['workout_type'])
+        stats['source_version'] = self._workouts_version(username)
+        self.storage.save_state(username, 'workout_stats', stats)
+        return stats
+    
+    def rebuild_workout_stats(self, username):
+        """Пересчитывает сводку тренировок пользователя по всему журналу"""
+        version = self._workouts_version(username)
+        stats = workout_stats.build_stats(self.get_all_workouts(username))
+        stats['source_version'] = version
+        self.storage.save_state(username, 'workout_stats', stats)
+        return stats
+    
+    def _update_workout_rollups(self, username, workout, version_before):
+        """Прибавляет тренировку к строкам дневной, недельной и месячной сводок"""
+        if self.storage.rollups_version(username) != version_before:
+            self.rebuild_workout_rollups(username)
+            return
+        rows = rollups.workout_rows(workout['date'], workout['duration'],
+                                    workout['workout_type'], workout['intensity'])
+        self.storage.add_rollups(username, rows, self._workouts_version(username))
+    
+    def rebuild_workout_rollups(self, username):
+        """Пересчитывает сводки по дням, неделям и месяцам по всему журналу"""
+        version = self._workouts_version(username)
+        self.storage.replace_rollups(username, rollups.build_rollups(self.get_all_workouts(username)), version)
+    
+    def _ensure_rollups(self, username):
+        """Пересчитывает сводки, если они отстали от журнала тренировок"""
+        if self.storage.rollups_version(username) != self._workouts_version(username):
+            self.rebuild_workout_rollups(username)
+    
+    def get_rollups(self, username, grain, start=None, end=None):
+        """Строки сводки grain ('day', 'week', 'month') за периоды, пересекающиеся с [start, end]; начало периода в индексе"""
+        self._ensure_rollups(username)
+        start_key = rollups.bucket_keys(start)[grain] if start is not None else None
+        end_key = rollups.bucket_keys(end)[grain] if end is not None else None
+        return rollups.to_frame(grain, self.storage.load_rollups(username, grain, start_key, end_key))
+    
+    def get_rollup_span(self, username):
+        """Первый и последний день с тренировками или None"""
+        self._ensure_rollups(username)
+        span = self.storage.rollup_day_span(username)
+        return (pd.Timestamp(span[0]), pd.Timestamp(span[1])) if span else None
+    
+    def _recent_day_rollups(self, username, now=None):
+        """Строки дневной сводки за окно счетчика «тренировок за месяц»"""
+        now = now or datetime.now()
+        return self.get_rollups(username, 'day', now - timedelta(days=workout_stats.MONTH_DAYS), now)
+    
+    def rebuild_all_workout_stats(self):
+        """Пересчитывает сводки всех пользователей (восстановление после сбоев)"""
+        users = self.storage.list_users()
+        for username in users:
+            self.rebuild_workout_stats(username)
+            self.rebuild_workout_rollups(username)
+        return len(users)
     
     def get_statistics(self, username):
         """Возвращает статистику тренировок пользователя"""
-        df = self.get_all_workouts(username)
-        if df.empty:
-            return {}
-        
-        stats = {
-            'total_workouts': len(df),
-            'total_minutes': df['duration'].sum(),
-            'avg_duration': df['duration'].mean(),
-            'workouts_this_month': len(df[df['date'] >= (datetime.now() - timedelta(days=30))]),
-            'last_workout': df['date'].max() if not df.empty else None,
-            'workout_streak': self.calculate_streak(df),
-            'favorite_workout': df['workout_type'].mode().iloc[0] if not df['workout_type'].mode().empty else "Нет данных"
-        }
-        return stats
+        # Читаем сохраненную сводку; журнал пересчитывается, только если она устарела
+        stats = self.storage.load_state(username, 'workout_stats')
+        if (stats is None or stats.get('needs_rebuild') or
+                stats.get('source_version') != self._workouts_version(username)):
+            stats = self.rebuild_workout_stats(username)
+        now = datetime.now()
+        return workout_stats.summarize(stats, self._recent_day_rollups(username, now), now)
     
     def calculate_streak(self, df):
         """Рассчитывает текущую серию тренировок подряд"""
         if df.empty:
             return 0
-        
-        df = df.sort_values('date', ascending=False)
-        dates = df['date'].dt.date.unique()
-        
-        streak = 0
-        current_date = datetime.now().date()
-        
-        for date in sorted(dates, reverse=True):
-            if (current_date - date).days == streak:
-                streak += 1
-            else:
-                break
-        
-        return streak
+        return analyze_streaks(df['date'].values)['current_streak']
+    
+    def get_streak_report(self, username, min_sessions_per_week=3):
+        """Возвращает серии дней и недель и перерывы между тренировками"""
+        # Серии считаются по дням, поэтому хватает дневной сводки: день повторяется по числу тренировок
+        days = self.get_rollups(username, 'day')
+        dates = np.repeat(days.index.values, days['sessions'].values.astype(int))
+        return analyze_streaks(dates, min_sessions_per_week=min_sessions_per_week)
     
     def get_achievements(self, username):
         """Возвращает достижения пользователя"""
-        stats = self.get_statistics(username)
-        profile = self.load_user_profile(username)
-        
-        achievements = []
-        
-        # Базовые достижения
-        if stats.get('total_workouts', 0) >= 1:
-            achievements.append({
-                'id': 'first_workout',
-                'title': '🎖️ Первая тренировка',
-                'description': 'Выполнена первая тренировка',
-                'icon': '🎖️',
-                'unlocked': True
-            })
-        
-        if stats.get('total_workouts', 0) >= 10:
-            achievements.append({
-                'id': 'dedicated',
-                'title': '🔥 Посвящение',
-                'description': '10 выполненных тренировок',
-                'icon': '🔥',
-                'unlocked': True
-            })
-        
-        if stats.get('total_workouts', 0) >= 30:
-            achievements.append({
-                'id': 'consistent',
-                'title': '📅 Регулярность',
-                'description': '30 выполненных тренировок',
-                'icon': '📅',
-                'unlocked': True
-            })
-        
-        if stats.get('total_minutes', 0) >= 1000:
-            achievements.append({
-                'id': 'thousand_minutes',
-                'title': '⏱️ 1000 минут',
-                'description': '1000 минут тренировок',
-                'icon': '⏱️',
-                'unlocked': True
-            })
-        
-        if stats.get('workout_streak', 0) >= 7:
-            achievements.append({
-                'id': 'weekly_streak',
-                'title': '📆 Недельная серия',
-                'description': '7 тренировок подряд',
-                'icon': '📆',
-                'unlocked': True
-            })
-        
-        if stats.get('workout_streak', 0) >= 30:
-            achievements.append({
-                'id': 'monthly_streak',
-                'title': '🌟 Месячная серия',
-                'description': '30 тренировок подряд',
-                'icon': '🌟',
-                'unlocked': True
-            })
-        
-        # Достижение за заполнение анкеты
-        if profile.get('questionnaire_completed', False):
-            achievements.append({
-                'id': 'questionnaire_complete',
-                'title': '📝 Анкета заполнена',
-                'description': 'Вы заполнили свою анкету',
-                'icon': '📝',
-                'unlocked': True
-            })
-        
-        # Достижение за прогресс по весу
-        if profile.get('personal_info', {}).get('weight') and profile.get('goals', {}).get('target_weight'):
-            current = profile['personal_info']['weight']
-            target = profile['goals']['target_weight']
-            if abs(current - target) <= 2:
-                achievements.append({
-                    'id': 'goal_achieved',
-                    'title': '🏆 Цель достигнута!',
-                    'description': f'Достигнут целевой вес {target}кг',
-                    'icon': '🏆',
-                    'unlocked': True
-                })
-        
-        # Достижение за выбор программы
-        if profile.get('current_program'):
-            achievements.append({
-                'id': 'program_started',
-                'title': '📋 Программа начата',
-                'description': 'Вы начали тренировочную программу',
-                'icon': '📋',
-                'unlocked': True
-            })
-        
-        # Достижение за обратную связь
-        feedback_file = os.path.join(self.data_dir, 'user_feedback.csv')
-        if os.path.exists(feedback_file):
-            try:
-                feedback_df = pd.read_csv(feedback_file)
-                user_hash = hashlib.md5(username.encode()).hexdigest()[:8]
-                user_feedback_count = len(feedback_df[feedback_df['user_id'] == user_hash])
-                
-                if user_feedback_count >= 5:
-                    achievements.append({
-                        'id': 'feedback_pro',
-                        'title': '💬 Эксперт по обратной связи',
-                        'description': f'Оставил {user_feedback_count} отзывов',
-                        'icon': '💬',
-                        'unlocked': True
-                    })
-            except:
-                pass
-        
-        return achievements
+        state = self.achievement_engine.load_state(username)
+        if state is None or not state.get('backfilled'):
+            # Первое обращение: открываем достижения по уже накопленным данным
+            context = {
+                'stats': self.get_statistics(username),
+                'profile': self.load_user_profile(username),
+                'feedback_count': self.storage.count_feedback(user_hash(username))
+            }
+            state = self.achievement_engine.evaluate_all(username, context)
+        return self.achievement_engine.get_unlocked(state)
+
+# Инициализация приложения: один экземпляр на процесс сервера, общий для всех сессий
+@st.cache_resource(show_spinner="Загрузка модели рекомендаций...")
+def get_assistant():
+    """Создает общий экземпляр помощника (база знаний и модель загружаются один раз)"""
+    return SelfLearningFitnessAssistant()
 
-# Инициализация приложения
-app = SelfLearningFitnessAssistant()
+app = get_assistant()
+# Если модель переобучил другой процесс, подхватываем новые файлы
+app.reload_model_if_changed()
 
 # Система аутентификации
 def initialize_session_state():
@@ -1383,8 +1471,9 @@ def initialize_session_state():
         st.session_state.selected_day = None
     if 'show_admin_panel' not in st.session_state:
         st.session_state.show_admin_panel = False
-    if 'auto_retrain_message' not in st.session_state:
-        st.session_state.auto_retrain_message = None
+    if 'seen_retrain_job' not in st.session_state:
+        # Уведомляем только о дообучениях, завершившихся после начала сессии
+        st.session_state.seen_retrain_job = app.retrain_worker.status()['last_finished_job_id']
     if 'feedback_submitted' not in st.session_state:
         st.session_state.feedback_submitted = {}
     if 'rating_temp' not in st.session_state:
@@ -1396,6 +1485,14 @@ def initialize_session_state():
     if 'selected_workout_title' not in st.session_state:
         st.session_state.selected_workout_title = None
 
+def show_retrain_notification():
+    """Показывает уведомление о завершившемся фоновом дообучении"""
+    status = app.retrain_worker.status()
+    if status['last_finished_job_id'] > st.session_state.seen_retrain_job:
+        st.session_state.seen_retrain_job = status['last_finished_job_id']
+        if status['success']:
+            st.markdown(f'<div class="retrain-notification">🔄 {status["message"]}</div>', unsafe_allow_html=True)
+
 initialize_session_state()
 
 # Страница входа/регистрации
@@ -1403,9 +1500,7 @@ if not st.session_state.authenticated:
     st.markdown('<h1 class="main-header">💪 Фитнес Помощник</h1>', unsafe_allow_html=True)
     
     # Показываем уведомление об автоматическом дообучении если есть
-    if st.session_state.get('auto_retrain_message'):
-        st.markdown(f'<div class="retrain-notification">🔄 {st.session_state.auto_retrain_message}</div>', unsafe_allow_html=True)
-        st.session_state.auto_retrain_message = None
+    show_retrain_notification()
     
     if st.session_state.show_login:
         # Форма входа
@@ -1567,9 +1662,7 @@ else:
     user_profile = app.load_user_profile(st.session_state.current_user)
     
     # Показываем уведомление об автоматическом дообучении если есть
-    if st.session_state.get('auto_retrain_message'):
-        st.markdown(f'<div class="retrain-notification">🔄 {st.session_state.auto_retrain_message}</div>', unsafe_allow_html=True)
-        st.session_state.auto_retrain_message = None
+    show_retrain_notification()
     
     # Отображение текущего пользователя
     st.sidebar.markdown(f'<div class="user-card">👤 {st.session_state.current_user}</div>', unsafe_allow_html=True)
@@ -1589,14 +1682,7 @@ else:
     # Показываем текущую программу
     if user_profile.get('current_program'):
         current_program_id = user_profile['current_program']
-        program_info = None
-        for goal, programs in app.training_programs.items():
-            for program in programs:
-                if program['id'] == current_program_id:
-                    program_info = program
-                    break
-            if program_info:
-                break
+        program_info = app.catalog.get(current_program_id)
         
         if program_info:
             level_info = app.levels.get(program_info['level'], {})
@@ -1642,13 +1728,22 @@ else:
             st.markdown("### ⚙️ Администрирование")
             
             if st.button("🔄 Дообучить модель"):
-                with st.spinner("Анализ отзывов и дообучение..."):
-                    success, message = app.retrain_model_with_feedback()
-                    if success:
-                        st.success(message)
-                        st.balloons()
-                    else:
-                        st.warning(message)
+                success, message = app.retrain_worker.submit()
+                if success:
+                    st.info(message)
+                else:
+                    st.warning(message)
+            
+            # Состояние фонового дообучения
+            retrain_status = app.retrain_worker.status()
+            if retrain_status['state'] == 'queued':
+                st.caption("⏳ Дообучение в очереди")
+            elif retrain_status['state'] == 'running':
+                st.caption(f"⚙️ Идет дообучение (с {retrain_status['started_at'][11:19]})")
+            elif retrain_status['state'] == 'done':
+                st.caption(retrain_status['message'])
+            elif retrain_status['state'] == 'failed':
+                st.caption(f"⚠️ {retrain_status['message']}")
             
             if st.button("📊 Статистика модели"):
                 model_info = app.get_model_info()
@@ -1656,26 +1751,42 @@ else:
                     st.write(f"**Тип модели:** {model_info.get('model_type', 'Неизвестно')}")
                     st.write(f"**Количество признаков:** {model_info.get('feature_count', 0)}")
                     st.write(f"**Классы:** {', '.join(model_info.get('classes', []))}")
+                    st.write(f"**Версия:** {model_info.get('version')} ({model_info.get('training_samples')} примеров, хеш {model_info.get('content_hash')})")
+                    
+                    # Эффективность кэшей
+                    caches = (("Кэш рекомендаций", app.recommendation_cache), ("Кэш истории тренировок", app.workout_cache),
+                              ("Кэш графиков", app.chart_cache))
+                    for title, cache in caches:
+                        cache_stats = cache.stats()
+                        st.write(f"**{title}:** {cache_stats['size']}/{cache_stats['maxsize']} записей, "
+                                 f"попаданий {cache_stats['hits']}, промахов {cache_stats['misses']} "
+                                 f"({cache_stats['hit_rate']:.0%})")
                     
                     # Статистика по отзывам
-                    feedback_file = os.path.join(app.data_dir, 'user_feedback.csv')
-                    if os.path.exists(feedback_file):
-                        try:
-                            feedback_df = pd.read_csv(feedback_file)
-                            st.write(f"**Всего отзывов:** {len(feedback_df)}")
-                            st.write(f"**Средний рейтинг:** {feedback_df['user_rating'].mean():.2f}")
-                        except:
-                            st.write("**Статистика отзывов:** Недоступна")
-            
-            if st.button("🧹 Очистить кэш модели"):
+                    try:
+                        feedback_summary = app.storage.feedback_summary()
+                        if feedback_summary['total']:
+                            st.write(f"**Всего отзывов:** {feedback_summary['total']}")
+                            st.write(f"**Средний рейтинг:** {feedback_summary['average_rating']:.2f}")
+                    except:
+                        st.write("**Статистика отзывов:** Недоступна")
+            
+            if st.button("🧮 Пересчитать статистику"):
+                with st.spinner("Пересчет статистики пользователей..."):
+                    users_count = app.rebuild_all_workout_stats()
+                st.success(f"✅ Статистика пересчитана для {users_count} пользователей.")
+            
+            clear_cache = st.button("🧹 Очистить кэш модели")
+            if clear_cache and app.retrain_worker.is_busy():
+                # Дообучение читает буфер и файлы модели: очистка доступна после его завершения
+                st.warning("⏳ Идет дообучение модели. Очистите кэш после его завершения.")
+            elif clear_cache:
                 try:
                     # Удаляем файлы модели
                     files_to_remove = [
-                        'training_recommender.pkl',
-                        'scaler.pkl', 
-                        'label_encoder.pkl',
+                        BUNDLE_FILE,
+                        *LEGACY_FILES,
                         'training_data.npz',
-                        'user_feedback.csv',
                         'retraining_log.json'
                     ]
                     removed = 0
@@ -1684,6 +1795,11 @@ else:
                         if os.path.exists(file_path):
                             os.remove(file_path)
                             removed += 1
+                    if app.storage.clear_feedback():
+                        removed += 1
+                    if len(app.training_buffer):
+                        app.training_buffer.clear()
+                        removed += 1
                     
                     # Перезагружаем модель
                     app.init_ml_model()
@@ -1752,14 +1868,7 @@ else:
                 st.markdown("### 🏃 Текущая программа тренировок")
                 
                 current_program_id = user_profile['current_program']
-                current_program = None
-                for goal, programs in app.training_programs.items():
-                    for program in programs:
-                        if program['id'] == current_program_id:
-                            current_program = program
-                            break
-                    if current_program:
-                        break
+                current_program = app.catalog.get(current_program_id)
                 
                 if current_program:
                     level_info = app.levels.get(current_program['level'], {})
@@ -1949,14 +2058,7 @@ else:
             # Показываем текущую программу
             if user_profile.get('current_program'):
                 current_program_id = user_profile['current_program']
-                current_program = None
-                for goal, programs in app.training_programs.items():
-                    for program in programs:
-                        if program['id'] == current_program_id:
-                            current_program = program
-                            break
-                    if current_program:
-                        break
+                current_program = app.catalog.get(current_program_id)
                 
                 if current_program:
                     st.markdown("### 🏃 Текущая программа")
@@ -1991,7 +2093,7 @@ else:
             
             # Показываем все программы для цели пользователя
             goal = user_profile.get('goals', {}).get('primary_goal', 'weight_loss')
-            goal_programs = app.training_programs.get(goal, [])
+            goal_programs = app.catalog.for_goal(goal)
             
             if goal_programs:
                 st.markdown(f"### 📊 Программы для вашей цели ({app.goals.get(goal, {}).get('name', 'Похудение')})")
@@ -2063,14 +2165,7 @@ else:
             auto_day = ""
             
             if st.session_state.selected_program_for_workout:
-                program_info = None
-                for goal, programs in app.training_programs.items():
-                    for program in programs:
-                        if program['id'] == st.session_state.selected_program_for_workout:
-                            program_info = program
-                            break
-                    if program_info:
-                        break
+                program_info = app.catalog.get(st.session_state.selected_program_for_workout)
                 
                 if program_info and st.session_state.selected_workout_title:
                     auto_workout_type = st.session_state.selected_workout_title
@@ -2176,6 +2271,30 @@ else:
                 st.session_state.selected_day_for_workout = None
                 st.session_state.selected_workout_title = None
                 st.rerun()
+        
+        # Импорт истории из других трекеров
+        with st.expander("📥 Импорт тренировок из файла"):
+            st.caption(
+                "CSV, JSON или JSON Lines с колонками date, workout_type, duration, intensity и (необязательно) notes. "
+                f"Длительность — от {workout_import.MIN_DURATION} до {workout_import.MAX_DURATION} минут, "
+                f"интенсивность — одно из значений: {', '.join(workout_import.INTENSITIES)}."
+            )
+            uploaded = st.file_uploader("Файл экспорта", type=['csv', 'json', 'jsonl'], key="workout_import_file")
+            if uploaded is not None and st.button("📥 Импортировать", key="workout_import_button"):
+                progress_bar = st.progress(0.0, text="Подготовка...")
+                success, message, report = app.import_workouts(
+                    st.session_state.current_user, uploaded.getvalue(), uploaded.name,
+                    progress=lambda fraction, text: progress_bar.progress(fraction, text=text)
+                )
+                if success:
+                    st.success(message)
+                else:
+                    st.error(message)
+                if not report.empty:
+                    st.warning(f"Строк с ошибками: {len(report)}")
+                    st.dataframe(report.head(100), use_container_width=True, hide_index=True)
+                    st.download_button("⬇️ Скачать отчет об ошибках", report.to_csv(index=False).encode('utf-8'),
+                                       file_name="import_errors.csv", mime="text/csv")
 
     # Мой прогресс
     elif st.session_state.current_page == "📈 Мой прогресс":
@@ -2183,7 +2302,6 @@ else:
         
         # Статистика тренировок
         stats = app.get_statistics(st.session_state.current_user)
-        workouts = app.get_all_workouts(st.session_state.current_user)
         
         if stats:
             col1, col2, col3, col4 = st.columns(4)
@@ -2198,45 +2316,63 @@ else:
                     st.metric("Средняя длительность", "0 мин")
             with col4:
                 st.metric("Текущая серия", f"{stats.get('workout_streak', 0)} дней")
+            
+            # Серии и перерывы по всей истории
+            streak_report = app.get_streak_report(st.session_state.current_user)
+            longest_gap = max((gap['days'] for gap in streak_report['gaps']), default=0)
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Самая длинная серия", f"{streak_report['longest_streak']} дней")
+            with col2:
+                st.metric("Недель подряд (3+ тренировки)", streak_report['current_weekly_streak'],
+                          help=f"Рекорд: {streak_report['longest_weekly_streak']} недель")
+            with col3:
+                st.metric("Самый долгий перерыв", f"{longest_gap} дней")
         
         # График тренировок
-        if not workouts.empty:
+        if stats:
             st.markdown("### 📊 График активности")
             
-            # Группируем по дням
-            workouts['date_only'] = workouts['date'].dt.date
-            daily_workouts = workouts.groupby('date_only').agg({
-                'duration': 'sum',
-                'workout_type': 'count'
-            }).reset_index()
-            daily_workouts.columns = ['date', 'total_minutes', 'workout_count']
-            
-            fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10))
-            
-            # График 1: Длительность тренировок по дням
-            ax1.bar(daily_workouts['date'], daily_workouts['total_minutes'], color='#4CAF50')
-            ax1.set_title('Длительность тренировок по дням', fontsize=14, fontweight='bold')
-            ax1.set_ylabel('Минуты')
-            ax1.grid(True, alpha=0.3)
-            plt.setp(ax1.xaxis.get_majorticklabels(), rotation=45)
-            
-            # График 2: Количество тренировок по дням
-            ax2.bar(daily_workouts['date'], daily_workouts['workout_count'], color='#2196F3')
-            ax2.set_title('Количество тренировок по дням', fontsize=14, fontweight='bold')
-            ax2.set_ylabel('Тренировки')
-            ax2.set_xlabel('Дата')
-            ax2.grid(True, alpha=0.3)
-            plt.setp(ax2.xaxis.get_majorticklabels(), rotation=45)
-            
-            plt.tight_layout()
-            st.pyplot(fig)
-            
-            # Таблица последних тренировок
+            # График рисуется один раз на версию журнала и период; длинные периоды — по неделям или месяцам
+            range_label = st.radio("Период", list(charts.RANGES), index=len(charts.RANGES) - 1,
+                                   horizontal=True, key='chart_range')
+            chart = app.get_activity_chart(st.session_state.current_user, charts.RANGES[range_label])
+            if chart:
+                png, grain = chart
+                st.image(png)
+                st.caption(f"Детализация: {charts.GRAINS[grain][0]}")
+            else:
+                st.info("За выбранный период тренировок нет.")
+            
+            # История за выбранный период постранично: читаются только строки текущей страницы
             st.markdown("### 📋 История тренировок")
-            recent_workouts = workouts.head(10).copy()
-            recent_workouts['date'] = recent_workouts['date'].dt.strftime('%d.%m.%Y %H:%M')
-            st.dataframe(recent_workouts[['date', 'workout_type', 'duration', 'intensity', 'notes']], 
-                        use_container_width=True, hide_index=True)
+            history_key = (st.session_state.current_user, range_label)
+            if st.session_state.get('history_key') != history_key:
+                st.session_state.history_key = history_key
+                st.session_state.history_cursors = [None]
+            cursors = st.session_state.history_cursors
+            range_days = charts.RANGES[range_label]
+            start = datetime.now().date() - timedelta(days=range_days - 1) if range_days else None
+            page = app.query_workouts(st.session_state.current_user, start=start, cursor=cursors[-1])
+            
+            recent_workouts = page['workouts']
+            if not recent_workouts.empty:
+                recent_workouts['date'] = recent_workouts['date'].dt.strftime('%d.%m.%Y %H:%M')
+                st.dataframe(recent_workouts[['date', 'workout_type', 'duration', 'intensity', 'notes']], 
+                            use_container_width=True, hide_index=True)
+            
+            pages_total = max(1, -(-page['total'] // HISTORY_PAGE_SIZE))
+            col1, col2, col3 = st.columns([1, 2, 1])
+            with col1:
+                if st.button("← Новее", disabled=len(cursors) == 1, key='history_newer'):
+                    cursors.pop()
+                    st.rerun()
+            with col2:
+                st.caption(f"Страница {len(cursors)} из {pages_total} · тренировок за период: {page['total']}")
+            with col3:
+                if st.button("Старше →", disabled=page['next_cursor'] is None, key='history_older'):
+                    cursors.append(page['next_cursor'])
+                    st.rerun()
         else:
             st.info("📝 У вас пока нет тренировок. Добавьте первую!")
 
@@ -2270,6 +2406,7 @@ else:
                             <h3>{achievement['icon']}</h3>
                             <h4>{achievement['title']}</h4>
                             <p>{achievement['description']}</p>
+                            <p><small>Получено: {datetime.fromisoformat(achievement['unlocked_at']).strftime('%d.%m.%Y')}</small></p>
                         </div>
                         """, unsafe_allow_html=True)
             
@@ -2286,8 +2423,10 @@ else:
                 if stats.get('total_minutes', 0) < 1000:
                     goals_data.append(["⏱️ 1000 минут", f"{int(stats['total_minutes'])}/1000", "1000 минут тренировок"])
                 
-                if stats.get('workout_streak', 0) < 7:
+                if stats.get('longest_streak', 0) < 7:
                     goals_data.append(["📆 Недельная серия", f"{stats['workout_streak']}/7", "7 дней подряд"])
+                elif stats.get('longest_streak', 0) < 30:
+                    goals_data.append(["🌟 Месячная серия", f"{stats['workout_streak']}/30", "30 дней подряд"])
                 
                 if goals_data:
                     goals_df = pd.DataFrame(goals_data, columns=['Достижение', 'Прогресс', 'Осталось'])
@@ -2410,20 +2549,36 @@ else:
                         st.rerun()
                     else:
                         st.error("❌ Ошибка обновления профиля")
+        
+        # Выгрузка данных: файл собирается по блокам из хранилища и отдается кнопкой скачивания
+        st.markdown("---")
+        st.subheader("📦 Экспорт данных")
+        st.caption(f"Файл передается через память сервера, поэтому размер выгрузки ограничен {EXPORT_MAX_MB} МБ. "
+                   "Архив (zip) занимает в несколько раз меньше.")
+        export_format = st.selectbox("Формат:", list(data_export.EXPORT_FORMATS),
+                                     format_func=lambda f: data_export.EXPORT_FORMATS[f][0], key="export_format")
+        if st.button("📦 Подготовить файл", key="export_prepare"):
+            with st.spinner("Подготовка выгрузки..."):
+                success, result = app.export_user_data(st.session_state.current_user, export_format)
+            if success:
+                # Кнопка показывается один раз, сразу после подготовки: Streamlit держит переданные данные у себя,
+                # поэтому файл читается один раз и сразу удаляется, а повторные перезапуски страницы его не перечитывают
+                _, mime, extension = data_export.EXPORT_FORMATS[export_format]
+                try:
+                    with open(result, 'rb') as f:
+                        st.download_button("⬇️ Скачать выгрузку", f, mime=mime, key="export_download",
+                                           file_name=f"fitness_export_{datetime.now():%Y%m%d}{extension}")
+                finally:
+                    os.remove(result)
+            else:
+                st.error(result)
 
 # Обработка просмотра деталей программы (ИСПРАВЛЕННАЯ)
 if st.session_state.get('show_program_details'):
     program_id = st.session_state.show_program_details
     
     # Находим программу
-    program_info = None
-    for goal, programs in app.training_programs.items():
-        for program in programs:
-            if program['id'] == program_id:
-                program_info = program
-                break
-        if program_info:
-            break
+    program_info = app.catalog.get(program_id)
     
     if program_info:
         # Создаем модальное окно
@@ -0,0 +1,62 @@
+"""Сравнение задержки предсказания sklearn и скомпилированного леса.
+
+Запуск из корня проекта:
+    python benchmarks/bench_inference.py
+    python benchmarks/bench_inference.py --train-size 5000 --batch 1 100 10000
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.preprocessing import StandardScaler  # noqa: E402
+
+from bench_training import make_dataset  # noqa: E402
+from forest_compiler import compile_forest  # noqa: E402
+from trainer import fit_forest  # noqa: E402
+
+warnings.filterwarnings('ignore')
+
+
+def per_call(fn, calls):
+    """Среднее время одного вызова в миллисекундах (лучший из трех прогонов)"""
+    best = float('inf')
+    for _ in range(3):
+        started = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        best = min(best, (time.perf_counter() - started) / calls)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--train-size', type=int, default=2000)
+    parser.add_argument('--batch', type=int, nargs='+', default=[1, 10, 1000, 100000])
+    args = parser.parse_args()
+
+    X, y = make_dataset(args.train_size)
+    scaler = StandardScaler().fit(X)
+    model, _ = fit_forest(scaler.transform(X), y, n_jobs=1)
+    compile_started = time.perf_counter()
+    compiled = compile_forest(model, scaler)
+    print(f"Деревьев: {compiled.n_trees}, узлов: {len(compiled.feature)}, "
+          f"компиляция: {(time.perf_counter() - compile_started) * 1000:.1f} мс")
+
+    print(f"{'batch':>7} {'sklearn, ms':>12} {'compiled, ms':>13} {'speedup':>8} {'exact':>6}")
+    for batch in args.batch:
+        X_test, _ = make_dataset(batch, seed=batch)
+        exact = np.array_equal(model.predict_proba(scaler.transform(X_test)), compiled.predict_proba(X_test))
+        calls = max(1, 2000 // batch)
+        sklearn_ms = per_call(lambda: model.predict(scaler.transform(X_test)), calls)
+        compiled_ms = per_call(lambda: compiled.predict(X_test), calls)
+        print(f"{batch:>7} {sklearn_ms:>12.3f} {compiled_ms:>13.3f} {sklearn_ms / compiled_ms:>7.1f}x {str(exact):>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Замер холодного старта: время импортов (как python -X importtime) и время до первой отрисовки.
+
+Запуск из каталога, где лежит user_data (обычно корень проекта):
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --top 20 --output startup.json
+
+Каждый замер выполняется в новом процессе интерпретатора, чтобы кэш модулей не искажал результат.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+
+
+def first_render():
+    """Дочерний процесс: одна отрисовка app.py через AppTest, результат в stdout"""
+    started = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+
+    app_test = AppTest.from_file(APP_PATH, default_timeout=300)
+    app_test.run()
+    result = {
+        'first_render_seconds': time.perf_counter() - started,
+        'exceptions': [str(e.value)[:200] for e in app_test.exception],
+        'heavy_modules': {name: name in sys.modules for name in ('sklearn', 'matplotlib', 'seaborn', 'joblib')}
+    }
+    print('RESULT ' + json.dumps(result))
+
+
+def parse_importtime(stderr):
+    """Суммарное время импортов и модули верхнего уровня по накопленному времени"""
+    top_level = []
+    for line in stderr.splitlines():
+        # Формат строки: "import time: <self, us> | <cumulative, us> | <отступ><модуль>"
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line.split('|', 2)
+        # Вложенные импорты записаны с отступом; учитываем только импорты верхнего уровня
+        name = name[1:]
+        if not name.startswith(' '):
+            top_level.append((name, int(cumulative_us)))
+    total = sum(us for _, us in top_level)
+    return total / 1e6, sorted(top_level, key=lambda item: item[1], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--top', type=int, default=15, help='сколько самых медленных импортов показать')
+    parser.add_argument('--output', help='сохранить результаты в JSON (для сравнения между релизами)')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        first_render()
+        return
+
+    started = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', os.path.abspath(__file__), '--child'],
+        capture_output=True, text=True
+    )
+    wall_seconds = time.perf_counter() - started
+    result_lines = [line for line in process.stdout.splitlines() if line.startswith('RESULT ')]
+    if process.returncode != 0 or not result_lines:
+        print(process.stderr[-2000:])
+        sys.exit(process.returncode or 1)
+    result = json.loads(result_lines[-1][len('RESULT '):])
+
+    import_seconds, slowest = parse_importtime(process.stderr)
+    print(f"Процесс целиком:          {wall_seconds:.2f} с")
+    print(f"До первой отрисовки:      {result['first_render_seconds']:.2f} с")
+    print(f"Импорты (importtime):     {import_seconds:.2f} с")
+    loaded = [name for name, present in result['heavy_modules'].items() if present]
+    print(f"Тяжелые модули загружены: {', '.join(loaded) if loaded else 'нет'}")
+    if result['exceptions']:
+        print(f"Ошибки при отрисовке:     {result['exceptions']}")
+    print(f"\n{'модуль':<40} {'накопленно, мс':>15}")
+    for name, cumulative_us in slowest[:args.top]:
+        print(f"{name:<40} {cumulative_us / 1000:>15.1f}")
+
+    if args.output:
+        report = dict(result, wall_seconds=wall_seconds, import_seconds=import_seconds,
+                      slowest_imports=[{'module': name, 'ms': us / 1000} for name, us in slowest[:args.top]])
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
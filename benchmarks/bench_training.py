@@ -0,0 +1,78 @@
+"""Замер времени обучения и предсказания леса рекомендаций на разном числе потоков.
+
+Запуск из корня проекта:
+    python benchmarks/bench_training.py
+    python benchmarks/bench_training.py --sizes 2000 50000 --workers 1 2
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+# Импортируется заранее, чтобы время загрузки sklearn не попало в замер первого обучения
+import sklearn.ensemble  # noqa: F401
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_data import GOALS, generate_dataset  # noqa: E402
+from trainer import fit_forest, resolve_n_jobs  # noqa: E402
+
+warnings.filterwarnings('ignore')
+
+
+def make_dataset(n_samples, seed=42):
+    """Синтетические анкеты (возраст, вес, рост, пол, ИМТ) и номера целей"""
+    X, goals = generate_dataset(n_samples, seed=seed)
+    return X, np.searchsorted(np.array(sorted(GOALS)), goals)
+
+
+def time_call(fn, repeat):
+    """Лучшее время из repeat запусков"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[2000, 50000, 500000])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, -1],
+                        help='число потоков; -1 — все ядра')
+    parser.add_argument('--repeat', type=int, default=1, help='повторов обучения на каждую точку')
+    args = parser.parse_args()
+
+    # Число потоков больше числа ядер не дает выигрыша, такие точки пропускаем
+    workers = []
+    for n_jobs in args.workers:
+        if resolve_n_jobs(n_jobs) not in [resolve_n_jobs(w) for w in workers]:
+            workers.append(n_jobs)
+
+    print(f"Ядер: {os.cpu_count()}")
+    print(f"{'samples':>9} {'workers':>8} {'fit, s':>9} {'predict all, s':>15} {'predict 1, ms':>14}")
+    for n_samples in args.sizes:
+        X, y = make_dataset(n_samples)
+        one = X[:1]
+        for n_jobs in workers:
+            holder = {}
+
+            def fit():
+                holder['model'], _ = fit_forest(X, y, n_jobs=n_jobs)
+
+            fit_seconds = time_call(fit, args.repeat)
+            model = holder['model']
+            model.n_jobs = n_jobs
+            predict_all = time_call(lambda: model.predict_proba(X), 1)
+            # Одна анкета — как в рекомендациях (лес после обучения работает в один поток)
+            model.n_jobs = 1
+            predict_one = time_call(lambda: model.predict_proba(one), 20)
+            print(f"{n_samples:>9} {resolve_n_jobs(n_jobs):>8} {fit_seconds:>9.3f} "
+                  f"{predict_all:>15.3f} {predict_one * 1000:>14.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Потокобезопасный LRU-кэш с проверкой версии данных и необязательным сроком жизни записей"""
+
+    def __init__(self, maxsize=128, ttl=None):
+        self.maxsize = maxsize
+        # Срок жизни записи в секундах (None — без ограничения)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version=None):
+        """Возвращает значение, если оно есть в кэше, не устарело и его версия совпадает, иначе None"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and self._expired(entry):
+                del self._data[key]
+                entry = None
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value, version=None):
+        """Сохраняет значение; при переполнении вытесняет давно неиспользуемые"""
+        with self._lock:
+            self._data[key] = (version, value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def _expired(self, entry):
+        return self.ttl is not None and time.monotonic() - entry[2] > self.ttl
+
+    def pop(self, key):
+        """Удаляет значение из кэша"""
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[1] if entry else None
+
+    def clear(self):
+        """Очищает кэш"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """Размер кэша и счетчики попаданий/промахов"""
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / requests if requests else 0.0
+            }
+
+    def __len__(self):
+        return len(self._data)
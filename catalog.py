@@ -0,0 +1,60 @@
+import re
+
+
+def _day_order(day_key):
+    """Ключ сортировки дней программы: day1, day2, ..., day10"""
+    match = re.search(r'\d+', day_key)
+    return (int(match.group()) if match else 0, day_key)
+
+
+class ProgramCatalog:
+    """Каталог тренировочных программ с индексами для быстрого поиска"""
+
+    def __init__(self, training_programs):
+        self.by_id = {}
+        self.by_goal = {}
+        self.by_level = {}
+        self.by_activity = {}
+        self.goal_of = {}
+        self.days = {}
+        self._ids_by_activity = {}
+
+        for goal, programs in training_programs.items():
+            self.by_goal[goal] = list(programs)
+            for program in programs:
+                program_id = program['id']
+                self.by_id[program_id] = program
+                self.goal_of[program_id] = goal
+                self.by_level.setdefault(program.get('level'), []).append(program)
+                for activity in program.get('activities', []):
+                    self.by_activity.setdefault(activity, []).append(program)
+                    self._ids_by_activity.setdefault(activity, set()).add(program_id)
+                # Дни тренировок в порядке номеров
+                self.days[program_id] = sorted(program.get('workouts', {}).keys(), key=_day_order)
+
+    def get(self, program_id):
+        """Возвращает программу по id или None"""
+        return self.by_id.get(program_id)
+
+    def for_goal(self, goal):
+        """Возвращает программы для цели"""
+        return self.by_goal.get(goal, [])
+
+    def for_level(self, level):
+        """Возвращает программы для уровня сложности"""
+        return self.by_level.get(level, [])
+
+    def for_activity(self, activity):
+        """Возвращает программы, включающие вид активности"""
+        return self.by_activity.get(activity, [])
+
+    def get_days(self, program_id):
+        """Возвращает упорядоченный список дней тренировок программы"""
+        return self.days.get(program_id, [])
+
+    def ids_with_any_activity(self, activities):
+        """Возвращает id программ, в которых есть хотя бы одна из активностей"""
+        ids = set()
+        for activity in activities:
+            ids |= self._ids_by_activity.get(activity, set())
+        return ids
@@ -0,0 +1,70 @@
+import io
+from datetime import date, timedelta
+
+import pandas as pd
+
+# Периоды графика активности (дней; None — вся история)
+RANGES = {'30 дней': 30, '90 дней': 90, 'Год': 365, 'Все время': None}
+# Детализация выбирается так, чтобы столбцов на графике было не больше MAX_BARS
+MAX_BARS = 120
+# Детализация: подпись и ширина столбца в днях
+GRAINS = {
+    'day': ('по дням', 0.8),
+    'week': ('по неделям', 5),
+    'month': ('по месяцам', 24),
+}
+CHART_DPI = 80
+
+
+def choose_grain(start, end):
+    """Самая подробная детализация, при которой столбцов не больше MAX_BARS"""
+    span = (end - start).days + 1
+    if span <= MAX_BARS:
+        return 'day'
+    if span / 7 <= MAX_BARS:
+        return 'week'
+    return 'month'
+
+
+def render_activity_png(series, grain):
+    """Рисует два графика (минуты и количество тренировок) и возвращает PNG"""
+    # Figure без pyplot: фигура не попадает в глобальный реестр и освобождается вместе с объектом
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    label, width = GRAINS[grain]
+    fig = Figure(figsize=(12, 10))
+    FigureCanvasAgg(fig)
+    ax1, ax2 = fig.subplots(2, 1)
+    dates = series.index.to_pydatetime()
+
+    # График 1: Длительность тренировок
+    ax1.bar(dates, series['minutes'], width=width, color='#4CAF50')
+    ax1.set_title(f'Длительность тренировок {label}', fontsize=14, fontweight='bold')
+    ax1.set_ylabel('Минуты')
+
+    # График 2: Количество тренировок
+    ax2.bar(dates, series['sessions'], width=width, color='#2196F3')
+    ax2.set_title(f'Количество тренировок {label}', fontsize=14, fontweight='bold')
+    ax2.set_ylabel('Тренировки')
+    ax2.set_xlabel('Дата')
+
+    for ax in (ax1, ax2):
+        ax.grid(True, alpha=0.3)
+        ax.tick_params(axis='x', labelrotation=45)
+    fig.tight_layout()
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=CHART_DPI)
+    fig.clear()
+    return buffer.getvalue()
+
+
+def chart_window(span, range_days=None, today=None):
+    """Начало, конец и детализация графика за последние range_days дней (None — вся история span)"""
+    end = pd.Timestamp(today or date.today())
+    if range_days is None:
+        start, end = span[0], max(end, span[1])
+    else:
+        start = end - timedelta(days=range_days - 1)
+    return start, end, choose_grain(start, end)
@@ -0,0 +1,108 @@
+import io
+import json
+import os
+import tempfile
+import time
+import zipfile
+
+from workout_log import WORKOUT_COLUMNS
+
+# Форматы выгрузки: подпись, MIME-тип и расширение файла
+EXPORT_FORMATS = {
+    'csv': ('Тренировки (CSV)', 'text/csv', '.csv'),
+    'jsonl': ('Профиль, тренировки и отзывы (JSON Lines)', 'application/x-ndjson', '.jsonl'),
+    'zip': ('Архив: CSV и JSON Lines', 'application/zip', '.zip'),
+}
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+EXPORT_PREFIX = 'fitness_export_'
+
+
+def write_workouts_csv(workout_chunks, out):
+    """Пишет тренировки в CSV по блокам; заголовок — один раз"""
+    header = True
+    for chunk in workout_chunks:
+        chunk = chunk.assign(date=chunk['date'].dt.strftime(DATE_FORMAT))
+        chunk.to_csv(out, header=header, index=False, columns=WORKOUT_COLUMNS, lineterminator='\n')
+        header = False
+    if header:
+        out.write(','.join(WORKOUT_COLUMNS) + '\n')
+
+
+def write_records_jsonl(profile, workout_chunks, feedback_chunks, out):
+    """Пишет профиль, тренировки и отзывы в JSON Lines: по объекту с полем type на строку"""
+    out.write(json.dumps({'type': 'profile', 'data': profile}, ensure_ascii=False, default=str) + '\n')
+    for record_type, chunks in (('workout', workout_chunks), ('feedback', feedback_chunks)):
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+            if record_type == 'workout':
+                chunk = chunk.assign(date=chunk['date'].dt.strftime(DATE_FORMAT))
+            lines = chunk.assign(type=record_type).to_json(orient='records', lines=True, force_ascii=False)
+            out.write(lines if lines.endswith('\n') else lines + '\n')
+
+
+def remove_stale_exports(max_age, directory=None):
+    """Удаляет файлы выгрузок старше max_age секунд (оставшиеся после сбоев и закрытых сессий); возвращает их число"""
+    directory = directory or tempfile.gettempdir()
+    border = time.time() - max_age
+    removed = 0
+    for entry in os.scandir(directory):
+        if not entry.name.startswith(EXPORT_PREFIX):
+            continue
+        try:
+            if entry.is_file() and entry.stat().st_mtime < border:
+                os.remove(entry.path)
+                removed += 1
+        except OSError:
+            # Файл уже удален другой сессией
+            pass
+    return removed
+
+
+def too_large_error(max_bytes):
+    return ValueError(f"выгрузка больше {max_bytes / 2 ** 20:g} МБ; выберите архив (zip) или обратитесь к администратору")
+
+
+def export_user_data(storage, username, feedback_user_id, export_format, directory=None, max_bytes=None):
+    """Выгружает данные пользователя во временный файл блоками из хранилища; возвращает путь к файлу.
+
+    Файл больше max_bytes байт удаляется с ValueError (запись прерывается, как только предел превышен).
+    """
+    _, _, extension = EXPORT_FORMATS[export_format]
+    fd, path = tempfile.mkstemp(prefix=EXPORT_PREFIX, suffix=extension, dir=directory)
+
+    def limited(chunks):
+        for chunk in chunks:
+            if max_bytes is not None and os.fstat(fd).st_size > max_bytes:
+                raise too_large_error(max_bytes)
+            yield chunk
+
+    def workout_chunks():
+        return limited(storage.iter_workouts(username))
+
+    def feedback_chunks():
+        return limited(chunk for chunk, _ in storage.iter_feedback(user_id=feedback_user_id))
+
+    def write_jsonl(out):
+        write_records_jsonl(storage.load_profile(username), workout_chunks(), feedback_chunks(), out)
+
+    try:
+        with open(fd, 'wb') as raw:
+            if export_format == 'zip':
+                with zipfile.ZipFile(raw, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+                    with io.TextIOWrapper(archive.open('workouts.csv', 'w'), encoding='utf-8', newline='') as out:
+                        write_workouts_csv(workout_chunks(), out)
+                    with io.TextIOWrapper(archive.open('data.jsonl', 'w'), encoding='utf-8', newline='') as out:
+                        write_jsonl(out)
+            else:
+                with io.TextIOWrapper(raw, encoding='utf-8', newline='') as out:
+                    if export_format == 'csv':
+                        write_workouts_csv(workout_chunks(), out)
+                    else:
+                        write_jsonl(out)
+        if max_bytes is not None and os.path.getsize(path) > max_bytes:
+            raise too_large_error(max_bytes)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
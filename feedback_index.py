@@ -0,0 +1,89 @@
+import io
+from collections import Counter
+
+import pandas as pd
+
+
+def complete_rows_end(data):
+    """Длина префикса data из целых строк CSV (перевод строки внутри кавычек строку не завершает)"""
+    end = data.rfind(b'\n') + 1
+    while end and data.count(b'"', 0, end) % 2:
+        end = data.rfind(b'\n', 0, end - 1) + 1
+    return end
+
+
+class FeedbackIndex:
+    """Индекс журнала отзывов: время последнего отзыва по (user_id, program_id) и счетчики"""
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.reset()
+
+    def reset(self):
+        """Сбрасывает индекс (журнал будет проиндексирован заново)"""
+        self.last_timestamp = {}
+        self.total = 0
+        self.rating_sum = 0.0
+        self.by_user = Counter()
+        self.by_program = Counter()
+        # Сколько байт журнала уже учтено в индексе
+        self.offset = 0
+
+    def add(self, record):
+        """Учитывает один отзыв"""
+        key = (record['user_id'], record['program_id'])
+        timestamp = record['timestamp']
+        if key not in self.last_timestamp or timestamp > self.last_timestamp[key]:
+            self.last_timestamp[key] = timestamp
+        self.total += 1
+        rating = record.get('user_rating')
+        if rating is not None and not pd.isna(rating):
+            self.rating_sum += float(rating)
+        self.by_user[record['user_id']] += 1
+        self.by_program[record['program_id']] += 1
+
+    def add_frame(self, df):
+        """Учитывает пачку отзывов"""
+        if df.empty:
+            return
+        self.total += len(df)
+        self.rating_sum += float(pd.to_numeric(df['user_rating'], errors='coerce').sum())
+        self.by_user.update(df['user_id'].value_counts().to_dict())
+        self.by_program.update(df['program_id'].value_counts().to_dict())
+        last = df.groupby(['user_id', 'program_id'])['timestamp'].max()
+        for key, timestamp in last.items():
+            if key not in self.last_timestamp or timestamp > self.last_timestamp[key]:
+                self.last_timestamp[key] = timestamp
+
+    def sync(self, path, size, chunk_bytes=1 << 20):
+        """Дочитывает в индекс только новые байты журнала блоками по chunk_bytes"""
+        if size < self.offset:
+            # Файл заменили или обрезали: индексируем с начала
+            self.reset()
+        if size == self.offset:
+            return
+        dtype = {'user_id': str, 'program_id': str, 'timestamp': str}
+        pending = b''
+        with open(path, 'rb') as f:
+            f.seek(self.offset)
+            remaining = size - self.offset
+            while remaining:
+                block = f.read(min(chunk_bytes, remaining))
+                if not block:
+                    break
+                remaining -= len(block)
+                data = pending + block
+                # Незавершенную последнюю строку оставляем до следующего блока (или следующего раза)
+                end = complete_rows_end(data)
+                if end:
+                    if self.offset == 0:
+                        df = pd.read_csv(io.BytesIO(data[:end]), dtype=dtype)
+                    else:
+                        df = pd.read_csv(io.BytesIO(data[:end]), header=None, names=self.columns, dtype=dtype)
+                    self.add_frame(df)
+                    self.offset += end
+                pending = data[end:]
+
+    def average_rating(self):
+        """Средний рейтинг всех отзывов"""
+        return self.rating_sum / self.total if self.total else None
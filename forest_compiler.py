@@ -0,0 +1,128 @@
+import numpy as np
+
+# Сколько строк обходится за раз (ограничивает память под промежуточные массивы)
+CHUNK_ROWS = 4096
+
+# Поля, которые сохраняются в пакете модели (плоские массивы отображаются в память)
+ARRAY_FIELDS = ('mean', 'scale', 'feature', 'threshold', 'left', 'right', 'value', 'roots', 'classes')
+
+
+class CompiledForest:
+    """Лес решающих деревьев и StandardScaler, развернутые в плоские массивы NumPy.
+
+    Все деревья лежат в общих массивах узлов; листья замкнуты сами на себя,
+    поэтому обход делает одинаковое число шагов для всех деревьев сразу.
+    """
+
+    def __init__(self, mean, scale, feature, threshold, left, right, value, roots, classes, max_depth):
+        self.mean = mean
+        self.scale = scale
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.classes = classes
+        self.max_depth = int(max_depth)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def transform(self, X):
+        """То же, что StandardScaler.transform"""
+        return (np.asarray(X, dtype=np.float64) - self.mean) / self.scale
+
+    def predict_proba(self, X):
+        """Вероятности классов, совпадающие с RandomForestClassifier.predict_proba"""
+        # Деревья sklearn сравнивают признаки во float32 с порогами во float64
+        X32 = self.transform(X).astype(np.float32).astype(np.float64)
+        if X32.shape[0] <= CHUNK_ROWS:
+            return self._predict_chunk(X32)
+        return np.vstack([self._predict_chunk(X32[start:start + CHUNK_ROWS])
+                          for start in range(0, X32.shape[0], CHUNK_ROWS)])
+
+    def _predict_chunk(self, X32):
+        """Обход всех деревьев сразу для блока строк"""
+        rows = np.arange(X32.shape[0])[:, None]
+        node = np.broadcast_to(self.roots, (X32.shape[0], self.n_trees)).copy()
+        for _ in range(self.max_depth):
+            go_left = X32[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        leaf_values = self.value[node]
+        # Суммируем деревья по порядку, как sklearn, чтобы совпадение было точным
+        proba = np.zeros((X32.shape[0], self.value.shape[1]))
+        for tree in range(self.n_trees):
+            proba += leaf_values[:, tree]
+        proba /= self.n_trees
+        return proba
+
+    def predict(self, X):
+        """Номера классов, совпадающие с RandomForestClassifier.predict"""
+        return self.classes.take(np.argmax(self.predict_proba(X), axis=1))
+
+    def to_arrays(self):
+        """Словарь массивов для сохранения"""
+        arrays = {field: getattr(self, field) for field in ARRAY_FIELDS}
+        arrays['max_depth'] = self.max_depth
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Восстанавливает лес из сохраненных массивов (они могут быть отображены в память)"""
+        return cls(**{field: arrays[field] for field in ARRAY_FIELDS}, max_depth=arrays['max_depth'])
+
+
+def compile_forest(model, scaler=None):
+    """Разворачивает обученный RandomForestClassifier (и скейлер) в CompiledForest"""
+    import sklearn
+
+    # До scikit-learn 1.4 листья хранили число примеров, и predict_proba нормировал их на лету
+    normalize_leaves = tuple(int(part) for part in sklearn.__version__.split('.')[:2]) < (1, 4)
+    n_features = model.n_features_in_
+    if scaler is not None and getattr(scaler, 'mean_', None) is not None:
+        mean = np.asarray(scaler.mean_, dtype=np.float64)
+    else:
+        mean = np.zeros(n_features)
+    if scaler is not None and getattr(scaler, 'scale_', None) is not None:
+        scale = np.asarray(scaler.scale_, dtype=np.float64)
+    else:
+        scale = np.ones(n_features)
+
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        n_nodes = tree.node_count
+        own = np.arange(n_nodes) + offset
+        is_leaf = tree.children_left < 0
+        # Листья ссылаются сами на себя: признак 0, порог +inf
+        features.append(np.where(is_leaf, 0, tree.feature).astype(np.intp))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+        lefts.append(np.where(is_leaf, own, tree.children_left + offset).astype(np.intp))
+        rights.append(np.where(is_leaf, own, tree.children_right + offset).astype(np.intp))
+        # Распределение классов в листе в том виде, как его возвращает DecisionTreeClassifier.predict_proba
+        value = tree.value[:, 0, :model.n_classes_]
+        if normalize_leaves:
+            normalizer = value.sum(axis=1)
+            normalizer[normalizer == 0.0] = 1.0
+            value = value / normalizer[:, np.newaxis]
+        values.append(np.ascontiguousarray(value, dtype=np.float64))
+        roots.append(offset)
+        max_depth = max(max_depth, tree.max_depth)
+        offset += n_nodes
+
+    return CompiledForest(
+        mean=mean,
+        scale=scale,
+        feature=np.concatenate(features),
+        threshold=np.concatenate(thresholds),
+        left=np.concatenate(lefts),
+        right=np.concatenate(rights),
+        value=np.concatenate(values),
+        roots=np.array(roots, dtype=np.intp),
+        classes=np.asarray(model.classes_),
+        max_depth=max_depth
+    )
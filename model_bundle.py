@@ -0,0 +1,138 @@
+import hashlib
+import os
+import pickle
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from forest_compiler import CompiledForest, compile_forest
+
+# Единый файл модели: лес, скейлер, кодировщик целей и манифест
+BUNDLE_FILE = 'model_bundle.joblib'
+# Файлы старого формата (три отдельных pickle)
+LEGACY_FILES = ('training_recommender.pkl', 'scaler.pkl', 'label_encoder.pkl')
+FEATURE_NAMES = ['age', 'weight', 'height', 'gender', 'bmi']
+# 2 — объекты sklearn хранятся отдельным pickle и загружаются по первому обращению
+FORMAT_VERSION = 2
+
+
+class ModelBundle:
+    """Загруженный пакет модели.
+
+    Скомпилированный лес и список целей доступны сразу и не требуют sklearn;
+    лес, скейлер и кодировщик sklearn распаковываются при первом обращении.
+    """
+
+    def __init__(self, manifest, compiled, goal_classes, estimators_blob=None, estimators=None):
+        self.manifest = manifest
+        self.compiled = compiled
+        self.goal_classes = goal_classes
+        self._estimators_blob = estimators_blob
+        self._estimators = estimators
+        self._lock = threading.Lock()
+
+    def _load_estimators(self):
+        with self._lock:
+            if self._estimators is None:
+                self._estimators = pickle.loads(self._estimators_blob)
+                self._estimators_blob = None
+            return self._estimators
+
+    @property
+    def model(self):
+        return self._load_estimators()[0]
+
+    @property
+    def scaler(self):
+        return self._load_estimators()[1]
+
+    @property
+    def label_encoder(self):
+        return self._load_estimators()[2]
+
+    def decode(self, encoded):
+        """Названия целей по номерам классов (то же, что label_encoder.inverse_transform)"""
+        return self.goal_classes[np.asarray(encoded)]
+
+
+def make_manifest(model, label_encoder, version, training_samples, content_hash):
+    """Описание содержимого пакета модели"""
+    return {
+        'format_version': FORMAT_VERSION,
+        'version': version,
+        'created_at': datetime.now().isoformat(),
+        'model_type': type(model).__name__,
+        'feature_names': FEATURE_NAMES,
+        'classes': [str(c) for c in label_encoder.classes_],
+        'training_samples': int(training_samples),
+        'n_trees': len(getattr(model, 'estimators_', [])),
+        'hash': content_hash
+    }
+
+
+def save_bundle(path, model, scaler, label_encoder, version, training_samples):
+    """Записывает пакет во временный файл и атомарно подменяет им текущий; возвращает ModelBundle"""
+    import joblib
+
+    estimators = (model, scaler, label_encoder)
+    blob = pickle.dumps(estimators, protocol=pickle.HIGHEST_PROTOCOL)
+    manifest = make_manifest(model, label_encoder, version, training_samples,
+                             content_hash=hashlib.sha256(blob).hexdigest()[:16])
+    compiled = compile_forest(model, scaler)
+    goal_classes = np.asarray(label_encoder.classes_).astype(str)
+    bundle = {
+        'manifest': manifest,
+        # Плоские массивы леса для быстрого предсказания (при загрузке отображаются в память)
+        'compiled': compiled.to_arrays(),
+        'goal_classes': goal_classes,
+        # Объекты sklearn нужны только для дообучения и больших пакетов
+        'estimators': np.frombuffer(blob, dtype=np.uint8)
+    }
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        # Без сжатия: иначе массивы нельзя отобразить в память при загрузке
+        joblib.dump(bundle, tmp_path)
+        with open(tmp_path, 'rb') as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return ModelBundle(manifest, compiled, goal_classes, estimators=estimators)
+
+
+def load_bundle(path, mmap=True):
+    """Загружает пакет; массивы NumPy отображаются в память и делятся между процессами"""
+    import joblib
+
+    # В Windows отображенный файл нельзя заменить через os.replace, поэтому там читаем в память
+    mmap = mmap and os.name != 'nt'
+    bundle = joblib.load(path, mmap_mode='r' if mmap else None)
+    manifest = bundle.get('manifest', {})
+    if manifest.get('format_version') == 1:
+        # Пакет первой версии хранил объекты sklearn напрямую: один раз перезаписываем в новом формате
+        return save_bundle(path, bundle['model'], bundle['scaler'], bundle['label_encoder'],
+                           version=manifest['version'], training_samples=manifest['training_samples'])
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Неподдерживаемый формат пакета модели: {manifest.get('format_version')}")
+    compiled = CompiledForest.from_arrays(bundle['compiled'])
+    if len(compiled.mean) != len(manifest['feature_names']):
+        raise ValueError("Число признаков модели не совпадает с манифестом")
+    return ModelBundle(manifest, compiled, bundle['goal_classes'], estimators_blob=bundle['estimators'])
+
+
+def migrate_legacy(data_dir):
+    """Переносит модель из трех pickle-файлов в единый пакет; возвращает ModelBundle или None"""
+    import joblib
+
+    legacy_paths = [os.path.join(data_dir, name) for name in LEGACY_FILES]
+    if not all(os.path.exists(p) for p in legacy_paths):
+        return None
+    model, scaler, label_encoder = (joblib.load(p) for p in legacy_paths)
+    samples = getattr(scaler, 'n_samples_seen_', 0)
+    bundle = save_bundle(os.path.join(data_dir, BUNDLE_FILE), model, scaler, label_encoder,
+                         version=1, training_samples=samples)
+    for p in legacy_paths:
+        os.remove(p)
+    return bundle
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+# Значения по умолчанию для незаполненных анкет
+DEFAULT_AGE = 30
+DEFAULT_WEIGHT = 70
+DEFAULT_HEIGHT = 170
+
+
+def profile_features(profiles):
+    """Матрица признаков (возраст, вес, рост, пол, ИМТ) для списка профилей"""
+    n = len(profiles)
+    infos = [profile.get('personal_info', {}) for profile in profiles]
+    X = np.empty((n, 5))
+    X[:, 0] = [info.get('age', DEFAULT_AGE) for info in infos]
+    X[:, 1] = [info.get('weight', DEFAULT_WEIGHT) for info in infos]
+    X[:, 2] = [info.get('height', DEFAULT_HEIGHT) for info in infos]
+    X[:, 3] = [0 if info.get('gender') == 'Женский' else 1 for info in infos]
+    X[:, 4] = X[:, 1] / (X[:, 2] / 100) ** 2
+    return X
+
+
+def feedback_features(feedback):
+    """Признаки, цели и оценки по пачке отзывов (строки без анкеты или оценки отбрасываются)"""
+    columns = ['user_age', 'user_weight', 'user_height', 'user_gender', 'user_rating']
+    numeric = feedback[columns].apply(pd.to_numeric, errors='coerce')
+    valid = numeric.notna().all(axis=1).values
+    numeric = numeric[valid]
+    X = np.empty((len(numeric), 5))
+    X[:, :4] = numeric[columns[:4]].values
+    X[:, 4] = X[:, 1] / (X[:, 2] / 100) ** 2
+    # Используем actual_user_goal если есть, иначе recommended_goal
+    goals = feedback.loc[valid, 'actual_user_goal'].fillna(feedback.loc[valid, 'recommended_goal'])
+    return X, goals.values.astype(str), numeric['user_rating'].values
+
+
+class ProgramMatrix:
+    """Программы каталога в виде массивов: цель каждой программы и матрица активностей"""
+
+    def __init__(self, catalog):
+        self.goals = list(catalog.by_goal.keys())
+        self.goal_index = {goal: i for i, goal in enumerate(self.goals)}
+        self.program_ids = []
+        program_goals = []
+        for goal, programs in catalog.by_goal.items():
+            for program in programs:
+                self.program_ids.append(program['id'])
+                program_goals.append(self.goal_index[goal])
+        self.program_ids = np.array(self.program_ids, dtype=object)
+        self.program_goal = np.array(program_goals, dtype=np.int64)
+
+        self.activities = sorted(catalog.by_activity.keys())
+        self.activity_index = {activity: i for i, activity in enumerate(self.activities)}
+        # activity_matrix[i, j] — есть ли в программе i активность j
+        self.activity_matrix = np.zeros((len(self.program_ids), len(self.activities)), dtype=bool)
+        position = {program_id: i for i, program_id in enumerate(self.program_ids)}
+        for activity, programs in catalog.by_activity.items():
+            rows = [position[program['id']] for program in programs]
+            self.activity_matrix[rows, self.activity_index[activity]] = True
+        self.goal_has_programs = np.bincount(self.program_goal, minlength=len(self.goals)) > 0
+
+    def goal_codes(self, goals, default=-1):
+        """Номера целей в матрице (default для неизвестных)"""
+        return np.array([self.goal_index.get(goal, default) for goal in goals], dtype=np.int64)
+
+    def preference_mask(self, activity_lists):
+        """Матрица предпочтений: строка — профиль, столбец — активность"""
+        mask = np.zeros((len(activity_lists), len(self.activities)), dtype=bool)
+        for row, activities in enumerate(activity_lists):
+            columns = [self.activity_index[a] for a in activities if a in self.activity_index]
+            mask[row, columns] = True
+        return mask
+
+    def rank(self, goal_codes, preference_mask, top_k=3):
+        """Первые top_k программ цели каждого профиля, с учетом активностей, если они что-то оставляют"""
+        candidates = self.program_goal[None, :] == goal_codes[:, None]
+        matching = (preference_mask.astype(np.int64) @ self.activity_matrix.T.astype(np.int64)) > 0
+        filtered = candidates & matching
+        use_filtered = filtered.any(axis=1)
+        selected = np.where(use_filtered[:, None], filtered, candidates)
+        # Стабильная сортировка сохраняет порядок программ в каталоге
+        order = np.argsort(~selected, axis=1, kind='stable')[:, :top_k]
+        counts = np.minimum(selected.sum(axis=1), top_k)
+        return [list(self.program_ids[order[i, :counts[i]]]) for i in range(len(goal_codes))]
@@ -0,0 +1,89 @@
+import queue
+import threading
+from datetime import datetime
+
+
+class RetrainWorker:
+    """Фоновый поток дообучения: очередь задач, не больше одной задачи в работе"""
+
+    def __init__(self, retrain_fn):
+        self.retrain_fn = retrain_fn
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._next_job_id = 1
+        self._idle = threading.Event()
+        self._idle.set()
+        self._status = {
+            'state': 'idle',
+            'job_id': 0,
+            'reason': None,
+            'submitted_at': None,
+            'started_at': None,
+            'finished_at': None,
+            'success': None,
+            'message': None,
+            # Последняя завершенная задача (для уведомлений)
+            'last_finished_job_id': 0
+        }
+
+    def _ensure_thread(self):
+        """Запускает поток при первой задаче"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='retrain-worker', daemon=True)
+            self._thread.start()
+
+    def submit(self, force_retrain=False, reason='manual'):
+        """Ставит задачу дообучения в очередь; возвращает (успех, сообщение)"""
+        with self._lock:
+            if self._status['state'] in ('queued', 'running'):
+                return False, "Дообучение уже выполняется, дождитесь его завершения."
+            job_id = self._next_job_id
+            self._next_job_id += 1
+            self._status.update({
+                'state': 'queued',
+                'job_id': job_id,
+                'reason': reason,
+                'submitted_at': datetime.now().isoformat(),
+                'started_at': None,
+                'finished_at': None,
+                'success': None,
+                'message': None
+            })
+            self._idle.clear()
+            self._queue.put((job_id, force_retrain))
+            self._ensure_thread()
+        return True, "Дообучение модели запущено в фоне."
+
+    def _run(self):
+        while True:
+            job_id, force_retrain = self._queue.get()
+            with self._lock:
+                self._status.update({'state': 'running', 'started_at': datetime.now().isoformat()})
+            try:
+                success, message = self.retrain_fn(force_retrain=force_retrain)
+            except Exception as e:
+                success, message = False, f"❌ Ошибка при дообучении модели: {e}"
+            with self._lock:
+                self._status.update({
+                    'state': 'done' if success else 'failed',
+                    'finished_at': datetime.now().isoformat(),
+                    'success': success,
+                    'message': message,
+                    'last_finished_job_id': job_id
+                })
+                self._idle.set()
+
+    def status(self):
+        """Снимок состояния текущей или последней задачи"""
+        with self._lock:
+            return dict(self._status)
+
+    def is_busy(self):
+        """Есть ли задача в очереди или в работе"""
+        with self._lock:
+            return self._status['state'] in ('queued', 'running')
+
+    def wait(self, timeout=None):
+        """Ожидает завершения текущей задачи (для скриптов)"""
+        return self._idle.wait(timeout)
@@ -0,0 +1,213 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: буфер используется одним процессом
+    fcntl = None
+
+# Режимы вытеснения: 'ring' — новые строки заменяют самые старые, 'reservoir' — равномерная выборка по всей истории
+MODES = ('ring', 'reservoir')
+LABEL_DTYPE = '<U16'
+
+
+class TrainingRingBuffer:
+    """Обучающие примеры фиксированного размера на диске: X и y в .npy, отображенных в память, и указатель головы.
+
+    Новые строки записываются на место, файлы не растут и не переписываются целиком.
+    Несколько процессов работают с буфером под файловой блокировкой и перечитывают указатель перед каждой операцией.
+    """
+
+    def __init__(self, directory, capacity=5000, n_features=5, mode='ring', seed=42, name='training'):
+        if mode not in MODES:
+            raise ValueError(f"Неизвестный режим буфера: {mode}")
+        self.directory = directory
+        self.n_features = n_features
+        self.mode = mode
+        self.seed = seed
+        self.x_path = os.path.join(directory, f'{name}_X.npy')
+        self.y_path = os.path.join(directory, f'{name}_y.npy')
+        self.meta_path = os.path.join(directory, f'{name}_meta.json')
+        self.lock_path = os.path.join(directory, f'{name}.lock')
+        self._lock = threading.Lock()
+        self._files_id = None
+        with self._locked():
+            self._open(capacity)
+
+    # Служебные методы
+    @contextmanager
+    def _locked(self):
+        """Блокировка потоков процесса и файловая блокировка между процессами"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _open(self, capacity):
+        """Открывает файлы буфера (создает или меняет емкость при необходимости)"""
+        if not self._refresh():
+            self._create(capacity)
+            return
+        if self.capacity != capacity:
+            X, y = self._ordered(self.X, self.y, self.size, self.head)
+            X, y = np.array(X), np.array(y)
+            self._create(capacity)
+            self._append(X, y)
+
+    def _refresh(self):
+        """Перечитывает указатель с диска и переоткрывает файлы, если их заменил другой процесс"""
+        meta = self._read_meta()
+        try:
+            files_id = (os.stat(self.x_path).st_ino, os.stat(self.y_path).st_ino)
+        except OSError:
+            return False
+        if meta is None:
+            return False
+        if files_id != self._files_id:
+            self.X = np.load(self.x_path, mmap_mode='r+')
+            self.y = np.load(self.y_path, mmap_mode='r+')
+            self._files_id = files_id
+        self.capacity = meta['capacity']
+        self.size = meta['size']
+        self.head = meta['head']
+        self.seen = meta['seen']
+        return True
+
+    def _create(self, capacity):
+        """Создает пустые файлы рядом и подменяет ими старые: открытые отображения старых файлов остаются рабочими"""
+        self.capacity = capacity
+        self.size = 0
+        self.head = 0
+        self.seen = 0
+        paths = ((self.x_path, np.float64, (capacity, self.n_features)), (self.y_path, LABEL_DTYPE, (capacity,)))
+        for path, dtype, shape in paths:
+            np.lib.format.open_memmap(f'{path}.tmp', mode='w+', dtype=dtype, shape=shape).flush()
+            os.replace(f'{path}.tmp', path)
+        self.X = np.load(self.x_path, mmap_mode='r+')
+        self.y = np.load(self.y_path, mmap_mode='r+')
+        self._files_id = (os.stat(self.x_path).st_ino, os.stat(self.y_path).st_ino)
+        self._write_meta()
+
+    def _read_meta(self):
+        try:
+            with open(self.meta_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self):
+        """Указатель обновляется после записи данных и атомарно: сбой не оставит ссылок на недописанные строки"""
+        meta = {'capacity': self.capacity, 'size': self.size, 'head': self.head, 'seen': self.seen, 'mode': self.mode}
+        tmp_path = f'{self.meta_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.meta_path)
+
+    def _slots(self, n):
+        """Номера ячеек для n новых строк (-1 — строка не попадает в буфер)"""
+        slots = np.full(n, -1, dtype=np.int64)
+        if self.mode == 'ring':
+            # Из пачки больше емкости в буфер попадут только последние строки
+            keep = min(n, self.capacity)
+            slots[n - keep:] = (self.head + np.arange(n - keep, n)) % self.capacity
+            return slots
+        # Резервуарная выборка: пока буфер не заполнен, строки дописываются,
+        # затем строка номер t заменяет случайную ячейку с вероятностью capacity / (t + 1)
+        free = min(n, self.capacity - self.size)
+        slots[:free] = self.size + np.arange(free)
+        if free < n:
+            rng = np.random.default_rng([self.seed, self.seen])
+            t = self.seen + np.arange(free, n)
+            j = rng.integers(0, t + 1)
+            replace = j < self.capacity
+            slots[free:][replace] = j[replace]
+        return slots
+
+    def _append(self, X, y):
+        n = len(X)
+        if n == 0:
+            return 0
+        slots = self._slots(n)
+        take = slots >= 0
+        # При повторе ячейки в пачке остается последняя строка
+        self.X[slots[take]] = X[take]
+        self.y[slots[take]] = y[take]
+        self.X.flush()
+        self.y.flush()
+        if self.mode == 'ring':
+            self.head = int((self.head + n) % self.capacity)
+        self.size = int(min(self.size + n, self.capacity))
+        self.seen += n
+        self._write_meta()
+        return int(take.sum())
+
+    def _ordered(self, X, y, size, head):
+        """Заполненные строки массивов буфера (для кольца — от старых к новым)"""
+        if self.mode == 'ring' and size == self.capacity and head:
+            order = np.concatenate([np.arange(head, self.capacity), np.arange(head)])
+            return X[order], y[order]
+        return X[:size], y[:size]
+
+    # Публичный интерфейс
+    def append(self, X, y):
+        """Добавляет строки на место; возвращает, сколько из них записано"""
+        X = np.asarray(X, dtype=np.float64).reshape(-1, self.n_features)
+        y = np.asarray(y).astype(LABEL_DTYPE)
+        with self._locked():
+            self._refresh()
+            return self._append(X, y)
+
+    def preview(self, X, y):
+        """Примеры, которые окажутся в буфере после append(X, y), — копии в памяти, файлы не меняются"""
+        X = np.asarray(X, dtype=np.float64).reshape(-1, self.n_features)
+        y = np.asarray(y).astype(LABEL_DTYPE)
+        with self._locked():
+            self._refresh()
+            X_all, y_all = np.array(self.X), np.array(self.y)
+            n = len(X)
+            slots = self._slots(n)
+            take = slots >= 0
+            X_all[slots[take]] = X[take]
+            y_all[slots[take]] = y[take]
+            head = (self.head + n) % self.capacity if self.mode == 'ring' else self.head
+            size = min(self.size + n, self.capacity)
+        return self._ordered(X_all, y_all, size, head)
+
+    def data(self):
+        """Текущие примеры (представления файлов; для кольца — от старых к новым)"""
+        with self._locked():
+            self._refresh()
+            return self._ordered(self.X, self.y, self.size, self.head)
+
+    def migrate_npz(self, npz_path):
+        """Переносит примеры из старого training_data.npz и удаляет его"""
+        if not os.path.exists(npz_path):
+            return 0
+        with np.load(npz_path, allow_pickle=True) as old_data:
+            added = self.append(old_data['X'], old_data['y'])
+        os.remove(npz_path)
+        return added
+
+    def clear(self):
+        """Удаляет все примеры: сбрасывается только указатель, файлы не обрезаются под открытыми представлениями"""
+        with self._locked():
+            self._refresh()
+            self.size = 0
+            self.head = 0
+            self.seen = 0
+            self._write_meta()
+
+    def __len__(self):
+        with self._locked():
+            self._refresh()
+            return self.size
@@ -0,0 +1,105 @@
+import json
+import os
+import threading
+
+import rollups
+
+META_FILE = 'meta.json'
+
+
+class RollupFiles:
+    """Сводки тренировок в каталоге пользователя: по файлу на часть таблицы (см. rollups.partition_key).
+
+    Новая тренировка переписывает три небольших файла, чтение диапазона затрагивает только пересекающиеся с ним части.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def _path(self, directory, grain, partition):
+        return os.path.join(directory, f'{grain}_{partition}.json')
+
+    def _read(self, path):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write(self, path, data):
+        """Атомарно сохраняет JSON (ключи строк по возрастанию)"""
+        temp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(data, f, sort_keys=True)
+        os.replace(temp_path, path)
+
+    def _partitions(self, directory, grain):
+        """Имена частей таблицы grain по возрастанию"""
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return []
+        prefix = f'{grain}_'
+        return sorted(name[len(prefix):-len('.json')] for name in names
+                      if name.startswith(prefix) and name.endswith('.json'))
+
+    def version(self, directory):
+        """Версия журнала, по которой построены сводки, или None"""
+        meta = self._read(os.path.join(directory, META_FILE))
+        return meta['source_version'] if meta else None
+
+    def load(self, directory, grain, start_key=None, end_key=None):
+        """Строки таблицы grain с ключами от start_key до end_key включительно, по возрастанию ключа"""
+        low = rollups.partition_key(grain, start_key) if start_key is not None else None
+        high = rollups.partition_key(grain, end_key) if end_key is not None else None
+        rows = {}
+        for partition in self._partitions(directory, grain):
+            if (low is not None and partition < low) or (high is not None and partition > high):
+                continue
+            for key, bucket in (self._read(self._path(directory, grain, partition)) or {}).items():
+                if (start_key is None or key >= start_key) and (end_key is None or key <= end_key):
+                    rows[key] = bucket
+        return rows
+
+    def day_span(self, directory):
+        """Первый и последний день с тренировками (ключи строк) или None"""
+        partitions = self._partitions(directory, 'day')
+        if not partitions:
+            return None
+        first = self._read(self._path(directory, 'day', partitions[0])) or {}
+        last = self._read(self._path(directory, 'day', partitions[-1])) or {}
+        if not first or not last:
+            return None
+        return min(first), max(last)
+
+    def add(self, directory, tables, version):
+        """Прибавляет строки к сохраненным; версия записывается последней"""
+        with self._lock:
+            os.makedirs(directory, exist_ok=True)
+            for grain, rows in tables.items():
+                by_partition = {}
+                for key, delta in rows.items():
+                    by_partition.setdefault(rollups.partition_key(grain, key), {})[key] = delta
+                for partition, deltas in by_partition.items():
+                    path = self._path(directory, grain, partition)
+                    stored = self._read(path) or {}
+                    for key, delta in deltas.items():
+                        rollups.merge_bucket(stored.setdefault(key, rollups.empty_bucket()), delta)
+                    self._write(path, stored)
+            self._write(os.path.join(directory, META_FILE), {'source_version': version})
+
+    def replace(self, directory, tables, version):
+        """Переписывает все таблицы; на время записи версия сбрасывается, чтобы сбой привел к пересчету"""
+        with self._lock:
+            os.makedirs(directory, exist_ok=True)
+            self._write(os.path.join(directory, META_FILE), {'source_version': None})
+            for grain in rollups.GRAINS:
+                for partition in self._partitions(directory, grain):
+                    os.remove(self._path(directory, grain, partition))
+            for grain, rows in tables.items():
+                by_partition = {}
+                for key, bucket in rows.items():
+                    by_partition.setdefault(rollups.partition_key(grain, key), {})[key] = bucket
+                for partition, partition_rows in by_partition.items():
+                    self._write(self._path(directory, grain, partition), partition_rows)
+            self._write(os.path.join(directory, META_FILE), {'source_version': version})
@@ -0,0 +1,91 @@
+from datetime import date
+
+import pandas as pd
+
+# Таблицы сводок: по дням, ISO-неделям и месяцам
+GRAINS = ('day', 'week', 'month')
+BUCKET_COLUMNS = ['minutes', 'sessions', 'type_minutes', 'intensity_counts']
+
+
+def empty_tables():
+    """Пустые таблицы сводок пользователя"""
+    return {grain: {} for grain in GRAINS}
+
+
+def empty_bucket():
+    return {'minutes': 0, 'sessions': 0, 'type_minutes': {}, 'intensity_counts': {}}
+
+
+def bucket_keys(moment):
+    """Ключи строк для даты: '2024-05-13', '2024-W20', '2024-05' (строки сортируются хронологически)"""
+    moment = pd.Timestamp(moment)
+    iso = moment.isocalendar()
+    return {'day': moment.strftime('%Y-%m-%d'), 'week': f'{iso[0]}-W{iso[1]:02d}', 'month': moment.strftime('%Y-%m')}
+
+
+def partition_key(grain, key):
+    """Часть таблицы, в которой хранится строка: дни — по месяцам, недели и месяцы — по годам"""
+    return key[:7] if grain == 'day' else key[:4]
+
+
+def period_start(grain, key):
+    """Начало периода по ключу строки"""
+    if grain == 'week':
+        year, week = key.split('-W')
+        return pd.Timestamp(date.fromisocalendar(int(year), int(week), 1))
+    return pd.Timestamp(key if grain == 'day' else f'{key}-01')
+
+
+def merge_bucket(bucket, delta):
+    """Прибавляет строку delta к строке bucket"""
+    bucket['minutes'] += delta['minutes']
+    bucket['sessions'] += delta['sessions']
+    for field in ('type_minutes', 'intensity_counts'):
+        for name, value in delta[field].items():
+            bucket[field][name] = bucket[field].get(name, 0) + value
+    return bucket
+
+
+def workout_rows(moment, duration, workout_type, intensity):
+    """Строки всех таблиц для одной тренировки — прибавляются к сохраненным за O(1)"""
+    duration = int(duration)
+    return {
+        grain: {key: {'minutes': duration, 'sessions': 1,
+                      'type_minutes': {workout_type: duration}, 'intensity_counts': {intensity: 1}}}
+        for grain, key in bucket_keys(moment).items()
+    }
+
+
+def build_rollups(df):
+    """Полностью пересчитывает таблицы по журналу тренировок"""
+    tables = empty_tables()
+    if df.empty:
+        return tables
+
+    dates = pd.to_datetime(df['date'])
+    iso = dates.dt.isocalendar()
+    keys = {
+        'day': dates.dt.strftime('%Y-%m-%d').values,
+        'week': (iso['year'].astype(str) + '-W' + iso['week'].astype(str).str.zfill(2)).values,
+        'month': dates.dt.strftime('%Y-%m').values,
+    }
+    duration = df['duration'].astype(int).values
+    for grain, key in keys.items():
+        table = tables[grain]
+        totals = pd.DataFrame({'key': key, 'duration': duration}).groupby('key')['duration'].agg(['sum', 'count'])
+        for bucket_key, minutes, sessions in totals.itertuples():
+            table[bucket_key] = {'minutes': int(minutes), 'sessions': int(sessions),
+                                 'type_minutes': {}, 'intensity_counts': {}}
+        by_type = pd.Series(duration).groupby([key, df['workout_type'].values]).sum()
+        for (bucket_key, workout_type), minutes in by_type.items():
+            table[bucket_key]['type_minutes'][str(workout_type)] = int(minutes)
+        by_intensity = pd.Series(duration).groupby([key, df['intensity'].values]).size()
+        for (bucket_key, intensity), count in by_intensity.items():
+            table[bucket_key]['intensity_counts'][str(intensity)] = int(count)
+    return tables
+
+
+def to_frame(grain, rows):
+    """Строки таблицы grain (ключ -> строка, по возрастанию ключа) в DataFrame с началом периода в индексе"""
+    index = pd.DatetimeIndex([period_start(grain, key) for key in rows], name='date')
+    return pd.DataFrame(list(rows.values()), index=index, columns=BUCKET_COLUMNS)
@@ -0,0 +1,732 @@
+import hashlib
+import io
+import json
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+import rollups
+from feedback_index import FeedbackIndex, complete_rows_end
+from rollup_files import RollupFiles
+from workout_log import WORKOUT_COLUMNS, WorkoutLog
+
+FEEDBACK_COLUMNS = [
+    'timestamp', 'user_id', 'user_age', 'user_weight', 'user_height', 'user_gender', 'user_bmi',
+    'program_id', 'recommended_goal', 'actual_user_goal', 'user_rating', 'user_comment'
+]
+# Размер блока при потоковом чтении отзывов: байт для CSV, строк для SQLite
+FEEDBACK_CHUNK_BYTES = 1 << 20
+FEEDBACK_CHUNK_ROWS = 10_000
+# Размер блока при потоковом чтении тренировок
+WORKOUT_CHUNK_ROWS = 10_000
+# Идентификаторы в отзывах — строки, даже если состоят из цифр (хэш '12e4' не должен стать числом)
+FEEDBACK_DTYPES = {'user_id': str, 'program_id': str, 'timestamp': str}
+# Ключ user_state с версией журнала, по которой построены сводки в workout_rollups
+ROLLUPS_VERSION_KEY = 'workout_rollups_version'
+# Ключ user_state со счетчиком записей в тренировки пользователя (версия без подсчета строк)
+WORKOUTS_VERSION_KEY = 'workouts_version'
+
+
+def user_hash(username):
+    """Анонимный идентификатор пользователя"""
+    return hashlib.md5(username.encode()).hexdigest()[:8]
+
+
+def create_storage(backend, data_dir):
+    """Создает хранилище выбранного типа ('file' или 'sqlite')"""
+    if backend == 'sqlite':
+        is_new = not os.path.exists(os.path.join(data_dir, 'fitness.db'))
+        storage = SQLiteStorage(data_dir)
+        # Новая база один раз заполняется данными файлового хранилища из того же каталога
+        if is_new and os.path.exists(os.path.join(data_dir, 'users.json')):
+            storage.import_from(FileStorage(data_dir))
+        return storage
+    if backend == 'file':
+        return FileStorage(data_dir)
+    raise ValueError(f"Неизвестный тип хранилища: {backend}")
+
+
+class FileStorage:
+    """Хранилище в файлах: users.json, профили в JSON, тренировки и отзывы в CSV"""
+
+    name = 'file'
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.users_file = os.path.join(data_dir, 'users.json')
+        self.feedback_file = os.path.join(data_dir, 'user_feedback.csv')
+        self.workout_log = WorkoutLog()
+        self.rollup_files = RollupFiles()
+        self._users_lock = threading.Lock()
+        self._feedback_lock = threading.RLock()
+        # Индекс отзывов в памяти, дочитывается по мере роста файла
+        self.feedback_index = FeedbackIndex(FEEDBACK_COLUMNS)
+
+    def _user_path(self, username, prefix, extension):
+        """Путь к файлу пользователя"""
+        return os.path.join(self.data_dir, f'{prefix}_{user_hash(username)}.{extension}')
+
+    # Пользователи
+    def _load_users(self):
+        if not os.path.exists(self.users_file):
+            return {}
+        with open(self.users_file, 'r') as f:
+            return json.load(f)
+
+    def get_password_hash(self, username):
+        """Возвращает хэш пароля пользователя или None"""
+        return self._load_users().get(username)
+
+    def create_user(self, username, password_hash):
+        """Создает пользователя; возвращает False, если он уже существует"""
+        with self._users_lock:
+            users = self._load_users()
+            if username in users:
+                return False
+            users[username] = password_hash
+            with open(self.users_file, 'w') as f:
+                json.dump(users, f)
+            return True
+
+    def list_users(self):
+        """Возвращает имена всех пользователей"""
+        return list(self._load_users().keys())
+
+    # Профили
+    def load_profile(self, username):
+        """Возвращает профиль пользователя или None"""
+        filename = self._user_path(username, 'profile', 'json')
+        if not os.path.exists(filename):
+            return None
+        with open(filename, 'r') as f:
+            return json.load(f)
+
+    def save_profile(self, username, profile):
+        """Сохраняет профиль пользователя"""
+        with open(self._user_path(username, 'profile', 'json'), 'w') as f:
+            json.dump(profile, f, indent=2)
+
+    # Служебные данные пользователя (сводки, счетчики)
+    def load_state(self, username, key):
+        """Возвращает сохраненный JSON-документ пользователя или None"""
+        filename = self._user_path(username, key, 'json')
+        if not os.path.exists(filename):
+            return None
+        with open(filename, 'r') as f:
+            return json.load(f)
+
+    def save_state(self, username, key, data):
+        """Атомарно сохраняет JSON-документ пользователя"""
+        filename = self._user_path(username, key, 'json')
+        temp_filename = f'{filename}.{threading.get_ident()}.tmp'
+        with open(temp_filename, 'w') as f:
+            json.dump(data, f)
+        os.replace(temp_filename, filename)
+
+    # Сводки тренировок по дням, неделям и месяцам
+    def _rollups_dir(self, username):
+        return os.path.join(self.data_dir, f'rollups_{user_hash(username)}')
+
+    def rollups_version(self, username):
+        """Версия журнала тренировок, по которой построены сводки, или None"""
+        return self.rollup_files.version(self._rollups_dir(username))
+
+    def load_rollups(self, username, grain, start_key=None, end_key=None):
+        """Строки сводки grain с ключами от start_key до end_key включительно, по возрастанию ключа"""
+        return self.rollup_files.load(self._rollups_dir(username), grain, start_key, end_key)
+
+    def rollup_day_span(self, username):
+        """Ключи первого и последнего дня с тренировками или None"""
+        return self.rollup_files.day_span(self._rollups_dir(username))
+
+    def add_rollups(self, username, tables, version):
+        """Прибавляет строки {grain: {ключ: строка}} к сводкам и отмечает их версией журнала"""
+        self.rollup_files.add(self._rollups_dir(username), tables, version)
+
+    def replace_rollups(self, username, tables, version):
+        """Заменяет все сводки пользователя"""
+        self.rollup_files.replace(self._rollups_dir(username), tables, version)
+
+    # Тренировки
+    def append_workout(self, username, record):
+        """Дописывает тренировку в журнал пользователя"""
+        self.workout_log.append(self._user_path(username, 'workouts', 'csv'), record)
+
+    def append_workouts(self, username, df):
+        """Дописывает пачку тренировок одной записью в журнал"""
+        self.workout_log.append_many(self._user_path(username, 'workouts', 'csv'), df)
+
+    def read_workouts(self, username):
+        """Возвращает все тренировки пользователя (дата уже разобрана)"""
+        return self.workout_log.read(self._user_path(username, 'workouts', 'csv'))
+
+    def iter_workouts(self, username, chunk_size=WORKOUT_CHUNK_ROWS):
+        """Все тренировки пользователя блоками по chunk_size строк"""
+        return self.workout_log.iter_chunks(self._user_path(username, 'workouts', 'csv'), chunk_size)
+
+    def query_workouts(self, username, start=None, end=None, limit=10, cursor=None):
+        """Страница тренировок от новых к старым за [start, end): {'workouts', 'next_cursor', 'total'}"""
+        return self.workout_log.query(self._user_path(username, 'workouts', 'csv'), start, end, limit, cursor)
+
+    def workouts_version(self, username):
+        """Версия журнала тренировок: время изменения и размер файла"""
+        try:
+            stat = os.stat(self._user_path(username, 'workouts', 'csv'))
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    # Отзывы
+    def _sync_feedback_index(self):
+        """Приводит индекс отзывов в соответствие с файлом (читается только новый хвост)"""
+        with self._feedback_lock:
+            try:
+                size = os.path.getsize(self.feedback_file)
+            except OSError:
+                self.feedback_index.reset()
+                return self.feedback_index
+            self.feedback_index.sync(self.feedback_file, size, FEEDBACK_CHUNK_BYTES)
+            return self.feedback_index
+
+    def append_feedback(self, record):
+        """Дописывает отзыв в общий журнал отзывов"""
+        with self._feedback_lock:
+            self._sync_feedback_index()
+            df = pd.DataFrame([record], columns=FEEDBACK_COLUMNS)
+            if os.path.exists(self.feedback_file):
+                df.to_csv(self.feedback_file, mode='a', header=False, index=False)
+            else:
+                df.to_csv(self.feedback_file, index=False)
+            self.feedback_index.add(record)
+            self.feedback_index.offset = os.path.getsize(self.feedback_file)
+
+    def read_feedback(self):
+        """Возвращает все отзывы"""
+        if not os.path.exists(self.feedback_file):
+            return pd.DataFrame(columns=FEEDBACK_COLUMNS)
+        return pd.read_csv(self.feedback_file, dtype=FEEDBACK_DTYPES)
+
+    def iter_feedback(self, since=0, user_id=None):
+        """Отзывы блоками, начиная с водяного знака since (смещение в байтах); отдает (DataFrame, новый знак)"""
+        try:
+            size = os.path.getsize(self.feedback_file)
+        except OSError:
+            return
+        if since > size:
+            # Журнал очищали: читаем с начала
+            since = 0
+        with open(self.feedback_file, 'rb') as f:
+            if since == 0:
+                since = len(f.readline())
+            f.seek(since)
+            position = since
+            pending = b''
+            while True:
+                block = f.read(FEEDBACK_CHUNK_BYTES)
+                data = pending + block
+                # Незавершенную последнюю строку оставляем до следующего блока (или следующего дообучения)
+                end = complete_rows_end(data)
+                if end:
+                    position += end
+                    chunk = pd.read_csv(io.BytesIO(data[:end]), header=None, names=FEEDBACK_COLUMNS,
+                                        dtype=FEEDBACK_DTYPES)
+                    if user_id is not None:
+                        chunk = chunk[chunk['user_id'] == user_id]
+                    yield chunk, position
+                pending = data[end:]
+                if not block:
+                    return
+
+    def has_recent_feedback(self, user_id, program_id, since):
+        """Проверяет, оставлял ли пользователь отзыв о программе после момента since"""
+        last = self._sync_feedback_index().last_timestamp.get((user_id, program_id))
+        return last is not None and pd.Timestamp(last) > since
+
+    def count_feedback(self, user_id=None, program_id=None):
+        """Количество отзывов (всех, одного пользователя или одной программы)"""
+        index = self._sync_feedback_index()
+        if user_id is not None:
+            return index.by_user[user_id]
+        if program_id is not None:
+            return index.by_program[program_id]
+        return index.total
+
+    def feedback_summary(self):
+        """Количество отзывов и средний рейтинг"""
+        index = self._sync_feedback_index()
+        return {'total': index.total, 'average_rating': index.average_rating()}
+
+    def clear_feedback(self):
+        """Удаляет все отзывы"""
+        with self._feedback_lock:
+            self.feedback_index.reset()
+            if os.path.exists(self.feedback_file):
+                os.remove(self.feedback_file)
+                return True
+            return False
+
+
+class SQLiteStorage:
+    """Хранилище во встроенной базе SQLite (режим WAL, пул соединений)"""
+
+    name = 'sqlite'
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            username TEXT PRIMARY KEY,
+            password_hash TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS profiles (
+            username TEXT PRIMARY KEY,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS workouts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user TEXT NOT NULL,
+            date TEXT NOT NULL,
+            workout_type TEXT,
+            duration INTEGER,
+            intensity TEXT,
+            notes TEXT,
+            program_id TEXT,
+            day TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_workouts_user_date ON workouts (user, date);
+        CREATE TABLE IF NOT EXISTS feedback (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            user_id TEXT NOT NULL,
+            user_age REAL,
+            user_weight REAL,
+            user_height REAL,
+            user_gender INTEGER,
+            user_bmi REAL,
+            program_id TEXT,
+            recommended_goal TEXT,
+            actual_user_goal TEXT,
+            user_rating INTEGER,
+            user_comment TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_feedback_user_program_ts ON feedback (user_id, program_id, timestamp);
+        CREATE TABLE IF NOT EXISTS feedback_counters (
+            scope TEXT NOT NULL,
+            key TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            rating_sum REAL NOT NULL,
+            PRIMARY KEY (scope, key)
+        );
+        CREATE TABLE IF NOT EXISTS user_state (
+            username TEXT NOT NULL,
+            key TEXT NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (username, key)
+        );
+        CREATE TABLE IF NOT EXISTS workout_rollups (
+            username TEXT NOT NULL,
+            grain TEXT NOT NULL,
+            period TEXT NOT NULL,
+            minutes INTEGER NOT NULL,
+            sessions INTEGER NOT NULL,
+            type_minutes TEXT NOT NULL,
+            intensity_counts TEXT NOT NULL,
+            PRIMARY KEY (username, grain, period)
+        );
+    """
+
+    def __init__(self, data_dir, filename='fitness.db', pool_size=8):
+        self.data_dir = data_dir
+        self.db_path = os.path.join(data_dir, filename)
+        # Свободные соединения; каждое в каждый момент используется одним потоком
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        with self._connection() as conn:
+            conn.executescript(self.SCHEMA)
+            # Базы, созданные до появления счетчиков, получают их один раз
+            has_counters = conn.execute('SELECT 1 FROM feedback_counters LIMIT 1').fetchone()
+            has_feedback = conn.execute('SELECT 1 FROM feedback LIMIT 1').fetchone()
+            if has_feedback and not has_counters:
+                self._rebuild_feedback_counters(conn)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA foreign_keys=ON')
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        """Берет соединение из пула и фиксирует транзакцию по завершении"""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    # Пользователи
+    def get_password_hash(self, username):
+        """Возвращает хэш пароля пользователя или None"""
+        with self._connection() as conn:
+            row = conn.execute('SELECT password_hash FROM users WHERE username = ?', (username,)).fetchone()
+        return row[0] if row else None
+
+    def create_user(self, username, password_hash):
+        """Создает пользователя; возвращает False, если он уже существует"""
+        with self._connection() as conn:
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO users (username, password_hash) VALUES (?, ?)',
+                (username, password_hash)
+            )
+            return cursor.rowcount == 1
+
+    def list_users(self):
+        """Возвращает имена всех пользователей"""
+        with self._connection() as conn:
+            return [row[0] for row in conn.execute('SELECT username FROM users')]
+
+    # Профили
+    def load_profile(self, username):
+        """Возвращает профиль пользователя или None"""
+        with self._connection() as conn:
+            row = conn.execute('SELECT data FROM profiles WHERE username = ?', (username,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_profile(self, username, profile):
+        """Сохраняет профиль пользователя"""
+        with self._connection() as conn:
+            conn.execute(
+                'INSERT INTO profiles (username, data) VALUES (?, ?) '
+                'ON CONFLICT(username) DO UPDATE SET data = excluded.data',
+                (username, json.dumps(profile))
+            )
+
+    # Служебные данные пользователя (сводки, счетчики)
+    def load_state(self, username, key):
+        """Возвращает сохраненный JSON-документ пользователя или None"""
+        with self._connection() as conn:
+            row = conn.execute(
+                'SELECT data FROM user_state WHERE username = ? AND key = ?', (username, key)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_state(self, username, key, data):
+        """Сохраняет JSON-документ пользователя"""
+        with self._connection() as conn:
+            conn.execute(
+                'INSERT INTO user_state (username, key, data) VALUES (?, ?, ?) '
+                'ON CONFLICT(username, key) DO UPDATE SET data = excluded.data',
+                (username, key, json.dumps(data))
+            )
+
+    # Сводки тренировок по дням, неделям и месяцам: строка на (пользователь, детализация, период)
+    def _save_rollups_version(self, conn, username, version):
+        conn.execute(
+            'INSERT INTO user_state (username, key, data) VALUES (?, ?, ?) '
+            'ON CONFLICT(username, key) DO UPDATE SET data = excluded.data',
+            (username, ROLLUPS_VERSION_KEY, json.dumps(version))
+        )
+
+    def _upsert_rollup_rows(self, conn, username, grain, rows):
+        conn.executemany(
+            'INSERT INTO workout_rollups (username, grain, period, minutes, sessions, type_minutes, intensity_counts) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT(username, grain, period) DO UPDATE SET minutes = excluded.minutes, '
+            'sessions = excluded.sessions, type_minutes = excluded.type_minutes, '
+            'intensity_counts = excluded.intensity_counts',
+            [(username, grain, key, bucket['minutes'], bucket['sessions'],
+              json.dumps(bucket['type_minutes']), json.dumps(bucket['intensity_counts']))
+             for key, bucket in rows.items()]
+        )
+
+    def rollups_version(self, username):
+        """Версия журнала тренировок, по которой построены сводки, или None"""
+        return self.load_state(username, ROLLUPS_VERSION_KEY)
+
+    def load_rollups(self, username, grain, start_key=None, end_key=None):
+        """Строки сводки grain с ключами от start_key до end_key включительно, по возрастанию ключа"""
+        conditions, params = ['username = ?', 'grain = ?'], [username, grain]
+        if start_key is not None:
+            conditions.append('period >= ?')
+            params.append(start_key)
+        if end_key is not None:
+            conditions.append('period <= ?')
+            params.append(end_key)
+        with self._connection() as conn:
+            rows = conn.execute(
+                'SELECT period, minutes, sessions, type_minutes, intensity_counts FROM workout_rollups '
+                f'WHERE {" AND ".join(conditions)} ORDER BY period',
+                params
+            ).fetchall()
+        return {
+            period: {'minutes': minutes, 'sessions': sessions,
+                     'type_minutes': json.loads(type_minutes), 'intensity_counts': json.loads(intensity_counts)}
+            for period, minutes, sessions, type_minutes, intensity_counts in rows
+        }
+
+    def rollup_day_span(self, username):
+        """Ключи первого и последнего дня с тренировками или None"""
+        with self._connection() as conn:
+            first, last = conn.execute(
+                "SELECT MIN(period), MAX(period) FROM workout_rollups WHERE username = ? AND grain = 'day'",
+                (username,)
+            ).fetchone()
+        return (first, last) if first is not None else None
+
+    def add_rollups(self, username, tables, version):
+        """Прибавляет строки {grain: {ключ: строка}} к сводкам и отмечает их версией журнала (одна транзакция)"""
+        with self._connection() as conn:
+            for grain, rows in tables.items():
+                merged = {}
+                for key, delta in rows.items():
+                    row = conn.execute(
+                        'SELECT minutes, sessions, type_minutes, intensity_counts FROM workout_rollups '
+                        'WHERE username = ? AND grain = ? AND period = ?',
+                        (username, grain, key)
+                    ).fetchone()
+                    bucket = rollups.empty_bucket()
+                    if row:
+                        bucket = {'minutes': row[0], 'sessions': row[1],
+                                  'type_minutes': json.loads(row[2]), 'intensity_counts': json.loads(row[3])}
+                    merged[key] = rollups.merge_bucket(bucket, delta)
+                self._upsert_rollup_rows(conn, username, grain, merged)
+            self._save_rollups_version(conn, username, version)
+
+    def replace_rollups(self, username, tables, version):
+        """Заменяет все сводки пользователя (одна транзакция)"""
+        with self._connection() as conn:
+            conn.execute('DELETE FROM workout_rollups WHERE username = ?', (username,))
+            for grain, rows in tables.items():
+                self._upsert_rollup_rows(conn, username, grain, rows)
+            self._save_rollups_version(conn, username, version)
+
+    # Тренировки
+    def _bump_workouts_version(self, conn, username):
+        """Увеличивает счетчик записей в тренировки пользователя (в транзакции самой записи)"""
+        conn.execute(
+            "INSERT INTO user_state (username, key, data) VALUES (?, ?, '1') "
+            'ON CONFLICT(username, key) DO UPDATE SET data = CAST(data AS INTEGER) + 1',
+            (username, WORKOUTS_VERSION_KEY)
+        )
+
+    def append_workout(self, username, record):
+        """Добавляет тренировку пользователя"""
+        values = [username] + [record.get(column, '') for column in WORKOUT_COLUMNS]
+        with self._connection() as conn:
+            conn.execute(
+                f"INSERT INTO workouts (user, {', '.join(WORKOUT_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(values))})",
+                values
+            )
+            self._bump_workouts_version(conn, username)
+
+    def append_workouts(self, username, df):
+        """Добавляет пачку тренировок одной транзакцией"""
+        rows = df.reindex(columns=WORKOUT_COLUMNS).fillna('').values.tolist()
+        with self._connection() as conn:
+            conn.executemany(
+                f"INSERT INTO workouts (user, {', '.join(WORKOUT_COLUMNS)}) "
+                f"VALUES (?, {', '.join('?' * len(WORKOUT_COLUMNS))})",
+                ([username] + row for row in rows)
+            )
+            self._bump_workouts_version(conn, username)
+
+    def read_workouts(self, username):
+        """Возвращает все тренировки пользователя (дата уже разобрана)"""
+        with self._connection() as conn:
+            df = pd.read_sql_query(
+                f"SELECT {', '.join(WORKOUT_COLUMNS)} FROM workouts WHERE user = ? ORDER BY date, id",
+                conn, params=(username,)
+            )
+        df['date'] = pd.to_datetime(df['date'], format='ISO8601')
+        return df
+
+    def iter_workouts(self, username, chunk_size=WORKOUT_CHUNK_ROWS):
+        """Все тренировки пользователя блоками по chunk_size строк (ключевая пагинация по (date, id))"""
+        last = None
+        while True:
+            query = f"SELECT id, {', '.join(WORKOUT_COLUMNS)} FROM workouts WHERE user = ?"
+            params = [username]
+            if last is not None:
+                query += ' AND (date > ? OR (date = ? AND id > ?))'
+                params += [last[0], last[0], last[1]]
+            with self._connection() as conn:
+                chunk = pd.read_sql_query(f'{query} ORDER BY date, id LIMIT ?', conn, params=params + [chunk_size])
+            if chunk.empty:
+                return
+            last = (chunk['date'].iloc[-1], int(chunk['id'].iloc[-1]))
+            chunk = chunk.drop(columns='id')
+            chunk['date'] = pd.to_datetime(chunk['date'], format='ISO8601')
+            yield chunk
+            if len(chunk) < chunk_size:
+                return
+
+    def query_workouts(self, username, start=None, end=None, limit=10, cursor=None):
+        """Страница тренировок от новых к старым за [start, end): {'workouts', 'next_cursor', 'total'}"""
+        conditions, params = ['user = ?'], [username]
+        if start is not None:
+            conditions.append('date >= ?')
+            params.append(pd.Timestamp(start).strftime('%Y-%m-%d %H:%M:%S'))
+        if end is not None:
+            conditions.append('date < ?')
+            params.append(pd.Timestamp(end).strftime('%Y-%m-%d %H:%M:%S'))
+        where = ' AND '.join(conditions)
+        with self._connection() as conn:
+            total = conn.execute(f'SELECT COUNT(*) FROM workouts WHERE {where}', params).fetchone()[0]
+            if cursor is not None:
+                # Ключевая пагинация: строки строго после последней строки предыдущей страницы
+                where += ' AND (date < ? OR (date = ? AND id < ?))'
+                params += [cursor[0], cursor[0], cursor[1]]
+            df = pd.read_sql_query(
+                f"SELECT id, {', '.join(WORKOUT_COLUMNS)} FROM workouts WHERE {where} "
+                f"ORDER BY date DESC, id DESC LIMIT ?",
+                conn, params=params + [limit + 1]
+            )
+        next_cursor = None
+        if len(df) > limit:
+            df = df.iloc[:limit]
+            next_cursor = (df['date'].iloc[-1], int(df['id'].iloc[-1]))
+        df = df.drop(columns='id')
+        df['date'] = pd.to_datetime(df['date'], format='ISO8601')
+        return {'workouts': df, 'next_cursor': next_cursor, 'total': total}
+
+    def workouts_version(self, username):
+        """Версия тренировок пользователя: счетчик записей (один поиск по ключу, строки не считаются)"""
+        with self._connection() as conn:
+            row = conn.execute(
+                'SELECT data FROM user_state WHERE username = ? AND key = ?', (username, WORKOUTS_VERSION_KEY)
+            ).fetchone()
+        return (int(row[0]),) if row else (0,)
+
+    # Отзывы
+    def _rebuild_feedback_counters(self, conn):
+        """Пересчитывает счетчики отзывов по таблице feedback"""
+        conn.execute('DELETE FROM feedback_counters')
+        conn.execute(
+            "INSERT INTO feedback_counters (scope, key, count, rating_sum) "
+            "SELECT 'total', '', COUNT(*), COALESCE(SUM(user_rating), 0) FROM feedback"
+        )
+        for scope, column in (('user', 'user_id'), ('program', 'program_id')):
+            conn.execute(
+                f"INSERT INTO feedback_counters (scope, key, count, rating_sum) "
+                f"SELECT '{scope}', {column}, COUNT(*), COALESCE(SUM(user_rating), 0) "
+                f"FROM feedback WHERE {column} IS NOT NULL GROUP BY {column}"
+            )
+
+    def append_feedback(self, record):
+        """Добавляет отзыв и обновляет счетчики в той же транзакции"""
+        values = [record.get(column) for column in FEEDBACK_COLUMNS]
+        rating = record.get('user_rating') or 0
+        with self._connection() as conn:
+            conn.execute(
+                f"INSERT INTO feedback ({', '.join(FEEDBACK_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(values))})",
+                values
+            )
+            conn.executemany(
+                'INSERT INTO feedback_counters (scope, key, count, rating_sum) VALUES (?, ?, 1, ?) '
+                'ON CONFLICT(scope, key) DO UPDATE SET count = count + 1, rating_sum = rating_sum + excluded.rating_sum',
+                [('total', '', rating), ('user', record['user_id'], rating), ('program', record['program_id'], rating)]
+            )
+
+    def read_feedback(self):
+        """Возвращает все отзывы"""
+        with self._connection() as conn:
+            return pd.read_sql_query(f"SELECT {', '.join(FEEDBACK_COLUMNS)} FROM feedback ORDER BY id", conn)
+
+    def iter_feedback(self, since=0, user_id=None):
+        """Отзывы блоками, начиная с водяного знака since (id отзыва); отдает (DataFrame, новый знак)"""
+        user_filter, user_params = ('AND user_id = ?', (user_id,)) if user_id is not None else ('', ())
+        while True:
+            with self._connection() as conn:
+                chunk = pd.read_sql_query(
+                    f"SELECT id, {', '.join(FEEDBACK_COLUMNS)} FROM feedback WHERE id > ? {user_filter} "
+                    f"ORDER BY id LIMIT ?",
+                    conn, params=(since, *user_params, FEEDBACK_CHUNK_ROWS)
+                )
+            if chunk.empty:
+                return
+            since = int(chunk['id'].iloc[-1])
+            yield chunk.drop(columns='id'), since
+            if len(chunk) < FEEDBACK_CHUNK_ROWS:
+                return
+
+    def has_recent_feedback(self, user_id, program_id, since):
+        """Проверяет, оставлял ли пользователь отзыв о программе после момента since"""
+        with self._connection() as conn:
+            row = conn.execute(
+                'SELECT MAX(timestamp) FROM feedback WHERE user_id = ? AND program_id = ?',
+                (user_id, program_id)
+            ).fetchone()
+        return row[0] is not None and pd.Timestamp(row[0]) > since
+
+    def _counter(self, scope, key):
+        with self._connection() as conn:
+            row = conn.execute(
+                'SELECT count, rating_sum FROM feedback_counters WHERE scope = ? AND key = ?', (scope, key)
+            ).fetchone()
+        return row or (0, 0.0)
+
+    def count_feedback(self, user_id=None, program_id=None):
+        """Количество отзывов (всех, одного пользователя или одной программы)"""
+        if user_id is not None:
+            return self._counter('user', user_id)[0]
+        if program_id is not None:
+            return self._counter('program', program_id)[0]
+        return self._counter('total', '')[0]
+
+    def feedback_summary(self):
+        """Количество отзывов и средний рейтинг"""
+        count, rating_sum = self._counter('total', '')
+        return {'total': count, 'average_rating': rating_sum / count if count else None}
+
+    def clear_feedback(self):
+        """Удаляет все отзывы"""
+        with self._connection() as conn:
+            conn.execute('DELETE FROM feedback_counters')
+            return conn.execute('DELETE FROM feedback').rowcount > 0
+
+    def import_from(self, source):
+        """Переносит пользователей, профили, тренировки и отзывы из другого хранилища"""
+        for username in source.list_users():
+            self.create_user(username, source.get_password_hash(username))
+            profile = source.load_profile(username)
+            if profile is not None:
+                self.save_profile(username, profile)
+            workouts = source.read_workouts(username)
+            if not workouts.empty:
+                workouts = workouts.copy()
+                workouts['date'] = workouts['date'].dt.strftime('%Y-%m-%d %H:%M:%S')
+                rows = [
+                    [username] + [None if pd.isna(value) else value for value in row]
+                    for row in workouts[WORKOUT_COLUMNS].itertuples(index=False)
+                ]
+                with self._connection() as conn:
+                    conn.executemany(
+                        f"INSERT INTO workouts (user, {', '.join(WORKOUT_COLUMNS)}) "
+                        f"VALUES ({', '.join('?' * (len(WORKOUT_COLUMNS) + 1))})",
+                        rows
+                    )
+                    self._bump_workouts_version(conn, username)
+        feedback = source.read_feedback()
+        if not feedback.empty:
+            rows = [
+                [None if pd.isna(value) else value for value in row]
+                for row in feedback.reindex(columns=FEEDBACK_COLUMNS).itertuples(index=False)
+            ]
+            with self._connection() as conn:
+                conn.executemany(
+                    f"INSERT INTO feedback ({', '.join(FEEDBACK_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(FEEDBACK_COLUMNS))})",
+                    rows
+                )
+                self._rebuild_feedback_counters(conn)
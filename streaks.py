@@ -0,0 +1,68 @@
+from datetime import date
+
+import numpy as np
+
+# Сдвиг, при котором неделя начинается с понедельника (1970-01-01 был четвергом)
+_WEEK_OFFSET = 3
+
+
+def _to_day_ordinals(dates):
+    """Переводит даты в номера дней от эпохи"""
+    return np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+
+
+def _runs(values):
+    """Длины серий подряд идущих целых чисел в отсортированном уникальном массиве"""
+    breaks = np.flatnonzero(np.diff(values) != 1)
+    starts = np.concatenate(([0], breaks + 1))
+    ends = np.concatenate((breaks, [values.size - 1]))
+    return ends - starts + 1
+
+
+def analyze_streaks(dates, today=None, min_sessions_per_week=3):
+    """Считает серии дней, серии недель с min_sessions_per_week тренировками и перерывы за один проход"""
+    today = today or date.today()
+    result = {
+        'current_streak': 0,
+        'last_run': 0,
+        'longest_streak': 0,
+        'current_weekly_streak': 0,
+        'longest_weekly_streak': 0,
+        'gaps': []
+    }
+    sessions = _to_day_ordinals(dates)
+    if sessions.size == 0:
+        return result
+
+    today_ordinal = int(np.datetime64(today, 'D').astype(np.int64))
+
+    # Серии дней
+    days = np.unique(sessions)
+    day_runs = _runs(days)
+    result['last_run'] = int(day_runs[-1])
+    result['longest_streak'] = int(day_runs.max())
+    # Как и раньше, текущая серия засчитывается, только если тренировка была сегодня
+    if days[-1] == today_ordinal:
+        result['current_streak'] = int(day_runs[-1])
+
+    # Перерывы между тренировками
+    steps = np.diff(days)
+    gap_index = np.flatnonzero(steps > 1)
+    gap_starts = (days[gap_index] + 1).astype('datetime64[D]')
+    gap_ends = (days[gap_index + 1] - 1).astype('datetime64[D]')
+    result['gaps'] = [
+        {'start': start.item(), 'end': end.item(), 'days': int(length)}
+        for start, end, length in zip(gap_starts, gap_ends, steps[gap_index] - 1)
+    ]
+
+    # Серии недель с достаточным количеством тренировок
+    weeks, counts = np.unique((sessions + _WEEK_OFFSET) // 7, return_counts=True)
+    active_weeks = weeks[counts >= min_sessions_per_week]
+    if active_weeks.size:
+        week_runs = _runs(active_weeks)
+        result['longest_weekly_streak'] = int(week_runs.max())
+        # Текущая неделя еще не закончилась, поэтому серия не прерывается до её конца
+        this_week = (today_ordinal + _WEEK_OFFSET) // 7
+        if active_weeks[-1] >= this_week - 1:
+            result['current_weekly_streak'] = int(week_runs[-1])
+    return result
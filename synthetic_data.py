@@ -0,0 +1,173 @@
+"""Синтетические анкеты для начального обучения модели.
+
+Офлайн-генерация и обучение из командной строки:
+    python synthetic_data.py --samples 1000000 --out user_data/synthetic
+    python synthetic_data.py --samples 1000000 --out user_data/synthetic --train user_data/model_bundle.joblib
+"""
+import argparse
+import time
+
+import numpy as np
+
+GOALS = ('weight_loss', 'muscle_gain', 'endurance', 'flexibility', 'health')
+# Размер блока при потоковой генерации
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+def generate_features(n_samples, rng):
+    """Признаки: возраст, вес, рост, пол (0-жен, 1-муж), ИМТ"""
+    X = np.empty((n_samples, 5))
+    X[:, 0] = rng.integers(16, 70, n_samples)
+    X[:, 1] = np.clip(rng.normal(75, 20, n_samples), 40, 150)
+    X[:, 2] = np.clip(rng.normal(170, 10, n_samples), 150, 210)
+    X[:, 3] = rng.integers(0, 2, n_samples)
+    X[:, 4] = X[:, 1] / (X[:, 2] / 100) ** 2
+    return X
+
+
+def assign_goals(X, rng):
+    """Цели по правилам (ИМТ, возраст, пол); правила проверяются по порядку, как цепочка if/elif"""
+    age, gender, bmi = X[:, 0], X[:, 3], X[:, 4]
+    conditions = [
+        (bmi > 28) & (age > 50),            # Ожирение в старшем возрасте
+        bmi > 28,                           # Ожирение
+        (bmi < 18.5) & (gender == 1),       # Недостаточный вес, мужчины
+        bmi < 18.5,                         # Недостаточный вес, женщины
+        age > 55,                           # Пожилые
+        (age < 25) & (gender == 1),         # Молодые мужчины
+        (bmi > 24) & (bmi <= 28),           # Избыточный вес
+    ]
+    choices = ['health', 'weight_loss', 'muscle_gain', 'health', 'flexibility', 'muscle_gain', 'weight_loss']
+    # Остальным — случайно выносливость или здоровье
+    default = np.where(rng.random(len(X)) < 0.5, 'endurance', 'health')
+    return np.select(conditions, choices, default=default)
+
+
+def resolve_priors(class_priors, y):
+    """Доли всех целей GOALS: названные берутся из class_priors, остаток делится между прочими по их доле в y.
+
+    Цель с нулевой долей выпала бы из обучающего набора и из LabelEncoder, поэтому такие доли отклоняются.
+    """
+    unknown = set(class_priors) - set(GOALS)
+    if unknown:
+        raise ValueError(f"Неизвестные цели: {', '.join(sorted(unknown))}")
+    if any(share <= 0 for share in class_priors.values()):
+        raise ValueError("Доли целей должны быть положительными")
+    rest = [goal for goal in GOALS if goal not in class_priors]
+    if not rest:
+        weights = np.array([class_priors[goal] for goal in GOALS], dtype=float)
+        return weights / weights.sum()
+    named = sum(class_priors.values())
+    if named >= 1:
+        raise ValueError(f"Доли названных целей в сумме {named:g}, для остальных ({', '.join(rest)}) ничего не остается")
+    natural = np.array([np.count_nonzero(y == goal) for goal in rest], dtype=float)
+    if natural.sum():
+        natural /= natural.sum()
+    shares = dict(zip(rest, (1 - named) * natural))
+    weights = np.array([class_priors.get(goal, shares.get(goal)) for goal in GOALS], dtype=float)
+    return weights / weights.sum()
+
+
+def apply_priors(X, y, class_priors, rng):
+    """Перевыборка строк, чтобы доли целей соответствовали class_priors (см. resolve_priors)"""
+    goals = list(GOALS)
+    weights = resolve_priors(class_priors, y)
+    counts = rng.multinomial(len(y), weights)
+    index = []
+    for goal, count in zip(goals, counts):
+        rows = np.flatnonzero(y == goal)
+        if count and rows.size == 0:
+            raise ValueError(f"Правила не порождают цель {goal}, задать её долю нельзя")
+        index.append(rng.choice(rows, size=count, replace=True) if count else rows[:0])
+    index = rng.permutation(np.concatenate(index))
+    return X[index], y[index]
+
+
+def generate_dataset(n_samples, seed=42, class_priors=None, rng=None):
+    """Генерирует n_samples анкет и целей; возвращает (X, y)"""
+    rng = rng if rng is not None else np.random.default_rng(seed)
+    X = generate_features(n_samples, rng)
+    y = assign_goals(X, rng)
+    if class_priors:
+        X, y = apply_priors(X, y, class_priors, rng)
+    return X, y
+
+
+def generate_chunks(n_samples, chunk_size=DEFAULT_CHUNK_SIZE, seed=42, class_priors=None):
+    """Генерирует данные блоками по chunk_size строк (один генератор на весь поток)"""
+    rng = np.random.default_rng(seed)
+    for start in range(0, n_samples, chunk_size):
+        yield generate_dataset(min(chunk_size, n_samples - start), class_priors=class_priors, rng=rng)
+
+
+def write_dataset(prefix, n_samples, chunk_size=DEFAULT_CHUNK_SIZE, seed=42, class_priors=None):
+    """Потоково пишет данные в prefix_X.npy и prefix_y.npy, не держа весь набор в памяти"""
+    X_out = np.lib.format.open_memmap(f"{prefix}_X.npy", mode='w+', dtype=np.float64, shape=(n_samples, 5))
+    y_out = np.lib.format.open_memmap(f"{prefix}_y.npy", mode='w+', dtype=f"<U{max(map(len, GOALS))}",
+                                      shape=(n_samples,))
+    position = 0
+    for X, y in generate_chunks(n_samples, chunk_size, seed, class_priors):
+        X_out[position:position + len(X)] = X
+        y_out[position:position + len(y)] = y
+        position += len(X)
+    X_out.flush()
+    y_out.flush()
+    return position
+
+
+def load_dataset(prefix, mmap=True):
+    """Читает набор, записанный write_dataset"""
+    mode = 'r' if mmap else None
+    return np.load(f"{prefix}_X.npy", mmap_mode=mode), np.load(f"{prefix}_y.npy", mmap_mode=mode)
+
+
+def parse_priors(text):
+    """Разбирает строку вида 'weight_loss=0.3,health=0.2' в словарь долей"""
+    if not text:
+        return None
+    priors = {}
+    for item in text.split(','):
+        goal, _, share = item.partition('=')
+        goal = goal.strip()
+        if goal not in GOALS:
+            raise ValueError(f"Неизвестная цель: {goal}")
+        priors[goal] = float(share)
+    return priors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, default=1_000_000)
+    parser.add_argument('--out', required=True, help='префикс файлов: <out>_X.npy и <out>_y.npy')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--priors', help="доли целей, например 'weight_loss=0.3,health=0.3,endurance=0.4'")
+    parser.add_argument('--train', metavar='BUNDLE', help='обучить модель и сохранить пакет по этому пути')
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    written = write_dataset(args.out, args.samples, args.chunk_size, args.seed, parse_priors(args.priors))
+    print(f"Сгенерировано {written} строк за {time.perf_counter() - started:.1f} с")
+
+    if args.train:
+        import warnings
+
+        from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+        from model_bundle import save_bundle
+        from trainer import fit_forest
+
+        warnings.filterwarnings('ignore')
+        X, y = load_dataset(args.out)
+        label_encoder = LabelEncoder()
+        y_encoded = label_encoder.fit_transform(y)
+        scaler = StandardScaler()
+        X_scaled = scaler.fit_transform(X)
+        model, train_seconds = fit_forest(X_scaled, y_encoded, n_jobs=args.n_jobs)
+        save_bundle(args.train, model, scaler, label_encoder, version=1, training_samples=len(X))
+        print(f"Модель обучена за {train_seconds:.1f} с и сохранена в {args.train}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+import os
+
+import pandas as pd
+import pytest
+
+from data_export import EXPORT_PREFIX, export_user_data
+from storage import FileStorage
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = FileStorage(str(tmp_path))
+    storage.create_user('bob', 'hash')
+    storage.append_workouts('bob', pd.DataFrame([
+        {'date': f'2024-05-{day:02d} 10:00:00', 'workout_type': 'Йога', 'duration': 30,
+         'intensity': 'Средняя', 'notes': 'заметка ' * 20, 'program_id': '', 'day': ''}
+        for day in range(1, 29)
+    ]))
+    return storage
+
+
+@pytest.mark.parametrize('export_format', ['csv', 'jsonl', 'zip'])
+def test_export_within_limit(storage, tmp_path, export_format):
+    out_dir = tmp_path / 'out'
+    out_dir.mkdir()
+    path = export_user_data(storage, 'bob', 'hash', export_format, directory=str(out_dir), max_bytes=1 << 20)
+    assert os.path.getsize(path) > 0
+
+
+@pytest.mark.parametrize('export_format', ['csv', 'jsonl'])
+def test_export_over_limit_is_removed(storage, tmp_path, export_format):
+    out_dir = tmp_path / 'out'
+    out_dir.mkdir()
+    with pytest.raises(ValueError):
+        export_user_data(storage, 'bob', 'hash', export_format, directory=str(out_dir), max_bytes=1000)
+    assert not [name for name in os.listdir(out_dir) if name.startswith(EXPORT_PREFIX)]
@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+
+from ring_buffer import TrainingRingBuffer
+
+
+@pytest.mark.parametrize('mode', ['ring', 'reservoir'])
+@pytest.mark.parametrize('stored', [3, 8, 20])
+def test_preview_matches_append_without_writing(tmp_path, mode, stored):
+    buffer = TrainingRingBuffer(str(tmp_path), capacity=10, n_features=2, mode=mode)
+    buffer.append(np.arange(stored * 2).reshape(-1, 2), [str(i) for i in range(stored)])
+    X_new, y_new = -np.ones((7, 2)) * np.arange(1, 8)[:, None], [f'new{i}' for i in range(7)]
+
+    X_before, y_before = (np.array(part) for part in buffer.data())
+    X_preview, y_preview = buffer.preview(X_new, y_new)
+    X_current, y_current = buffer.data()
+    assert np.array_equal(X_current, X_before) and np.array_equal(y_current, y_before)
+
+    buffer.append(X_new, y_new)
+    X_after, y_after = buffer.data()
+    assert np.array_equal(X_preview, X_after)
+    assert np.array_equal(y_preview, y_after)
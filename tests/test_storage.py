@@ -0,0 +1,44 @@
+import pandas as pd
+
+from storage import FEEDBACK_COLUMNS, FileStorage, SQLiteStorage
+
+
+def feedback_record(user_id, program_id, timestamp='2024-05-13 10:00:00'):
+    record = dict.fromkeys(FEEDBACK_COLUMNS, '')
+    record.update({'timestamp': timestamp, 'user_id': user_id, 'program_id': program_id,
+                   'user_age': 30, 'user_weight': 70, 'user_height': 175, 'user_gender': 1,
+                   'user_bmi': 22.9, 'user_rating': 5})
+    return record
+
+
+def test_import_keeps_numeric_looking_ids_as_strings(tmp_path):
+    source_dir = tmp_path / 'files'
+    source_dir.mkdir()
+    source = FileStorage(str(source_dir))
+    source.create_user('bob', 'hash')
+    source.append_feedback(feedback_record('12e4', '007'))
+    source.append_feedback(feedback_record('00123456', '42'))
+
+    target_dir = tmp_path / 'db'
+    target_dir.mkdir()
+    target = SQLiteStorage(str(target_dir))
+    target.import_from(source)
+
+    feedback = target.read_feedback()
+    assert feedback['user_id'].tolist() == ['12e4', '00123456']
+    assert feedback['program_id'].tolist() == ['007', '42']
+    assert target.count_feedback(user_id='12e4') == 1
+    assert target.count_feedback(program_id='007') == 1
+    assert target.has_recent_feedback('00123456', '42', pd.Timestamp('2024-05-01'))
+
+
+def test_sqlite_workouts_version_changes_on_every_write(tmp_path):
+    storage = SQLiteStorage(str(tmp_path))
+    workout = {'date': '2024-05-13 10:00:00', 'workout_type': 'Йога', 'duration': 30, 'intensity': 'Средняя'}
+    versions = [storage.workouts_version('bob')]
+    storage.append_workout('bob', workout)
+    versions.append(storage.workouts_version('bob'))
+    storage.append_workouts('bob', pd.DataFrame([workout] * 3))
+    versions.append(storage.workouts_version('bob'))
+    assert len(set(versions)) == 3
+    assert storage.workouts_version('alice') == versions[0]
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from synthetic_data import GOALS, generate_dataset, resolve_priors
+
+
+def test_partial_priors_keep_every_goal():
+    _, y = generate_dataset(20_000, class_priors={'weight_loss': 0.5})
+    goals, counts = np.unique(y, return_counts=True)
+    assert set(goals) == set(GOALS)
+    assert counts[list(goals).index('weight_loss')] / len(y) == pytest.approx(0.5, abs=0.02)
+
+
+def test_partial_priors_split_the_rest_by_natural_share():
+    y = np.array(['weight_loss'] * 10 + ['health'] * 60 + ['endurance'] * 20 + ['muscle_gain'] * 10)
+    weights = dict(zip(GOALS, resolve_priors({'weight_loss': 0.5, 'flexibility': 0.1}, y)))
+    assert weights['weight_loss'] == pytest.approx(0.5)
+    assert weights['flexibility'] == pytest.approx(0.1)
+    assert weights['health'] == pytest.approx(0.4 * 60 / 90)
+    assert weights['endurance'] == pytest.approx(0.4 * 20 / 90)
+    assert weights['muscle_gain'] == pytest.approx(0.4 * 10 / 90)
+
+
+@pytest.mark.parametrize('priors', [
+    {'weight_loss': 0.7, 'health': 0.3},
+    {'weight_loss': 0.0, 'muscle_gain': 0.2, 'endurance': 0.2, 'flexibility': 0.2, 'health': 0.4},
+    {'yoga': 0.2},
+])
+def test_priors_that_would_drop_a_goal_are_rejected(priors):
+    with pytest.raises(ValueError):
+        generate_dataset(1_000, class_priors=priors)
+
+
+def test_full_priors_are_normalized():
+    weights = resolve_priors(dict.fromkeys(GOALS, 2), np.array(['health']))
+    assert weights == pytest.approx(np.full(len(GOALS), 1 / len(GOALS)))
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+import workout_log
+from workout_log import INDEX_DTYPE, WorkoutLog
+
+
+def write_log(path):
+    rows = [{'date': f'2024-{month:02d}-{day:02d} 10:00:00', 'workout_type': 'Йога', 'duration': 30,
+             'intensity': 'Средняя', 'notes': 'с переводом\nстроки, "в кавычках"' if day % 3 else 'ok',
+             'program_id': '', 'day': ''}
+            for month in range(12, 0, -1) for day in range(1, 29)]
+    log = WorkoutLog()
+    log.append_many(str(path), pd.DataFrame(rows))
+    return len(rows)
+
+
+def test_index_built_in_blocks_matches_single_block(tmp_path, monkeypatch):
+    path = tmp_path / 'workouts.csv'
+    count = write_log(path)
+    log = WorkoutLog()
+    log._build_index(str(path))
+    whole = np.fromfile(f'{path}.idx', dtype=INDEX_DTYPE)
+
+    monkeypatch.setattr(workout_log, 'INDEX_CHUNK_BYTES', 97)
+    log._build_index(str(path))
+    blocks = np.fromfile(f'{path}.idx', dtype=INDEX_DTYPE)
+
+    assert len(whole) == count + 1
+    assert np.array_equal(whole, blocks)
+    assert np.all(np.diff(blocks['date'][1:]) >= 0)
+
+
+def test_query_reads_rows_at_block_built_offsets(tmp_path, monkeypatch):
+    path = tmp_path / 'workouts.csv'
+    write_log(path)
+    monkeypatch.setattr(workout_log, 'INDEX_CHUNK_BYTES', 64)
+    page = WorkoutLog().query(str(path), start='2024-03-01', end='2024-04-01', limit=5)
+    assert page['total'] == 28
+    assert page['workouts']['date'].tolist() == list(pd.date_range('2024-03-24 10:00', periods=5)[::-1])
+    assert page['workouts']['notes'].iloc[0] == 'с переводом\nстроки, "в кавычках"'
@@ -0,0 +1,72 @@
+import copy
+import os
+import time
+
+import numpy as np
+
+# Параметры леса рекомендаций (одинаковые для начального обучения и дообучения)
+FOREST_PARAMS = {
+    'n_estimators': 100,
+    'max_depth': 10,
+    'min_samples_split': 5,
+    'warm_start': True,  # Для инкрементального обучения
+    'random_state': 42,
+    'class_weight': 'balanced'
+}
+
+
+def resolve_n_jobs(n_jobs):
+    """Фактическое число потоков обучения (-1 — все ядра)"""
+    cpu_count = os.cpu_count() or 1
+    if n_jobs is None:
+        return 1
+    if n_jobs < 0:
+        return max(1, cpu_count + 1 + n_jobs)
+    return max(1, min(n_jobs, cpu_count))
+
+
+def make_forest(n_jobs=-1, **params):
+    """Создает лес с общими параметрами; params переопределяют значения по умолчанию"""
+    from sklearn.ensemble import RandomForestClassifier
+
+    return RandomForestClassifier(**{**FOREST_PARAMS, **params, 'n_jobs': n_jobs})
+
+
+def fit_forest(X, y, n_jobs=-1, **params):
+    """Обучает лес на n_jobs потоках; возвращает (модель, время обучения в секундах)"""
+    model = make_forest(n_jobs=n_jobs, **params)
+    started = time.perf_counter()
+    model.fit(X, y)
+    train_seconds = time.perf_counter() - started
+    # Рекомендации считаются по одной анкете: пул потоков там только добавляет задержку
+    model.n_jobs = 1
+    return model, train_seconds
+
+
+# Размер выборки повторения из буфера на один новый пример (и минимальный размер)
+REPLAY_PER_NEW_SAMPLE = 2
+MIN_REPLAY_SAMPLES = 500
+
+
+def replay_sample(X, y, n_new, rng):
+    """Случайная выборка старых примеров, чтобы новые деревья не забывали прежние данные"""
+    size = min(len(X), max(MIN_REPLAY_SAMPLES, REPLAY_PER_NEW_SAMPLE * n_new))
+    index = rng.choice(len(X), size=size, replace=False)
+    return X[index], y[index]
+
+
+def grow_forest(model, X, y, n_new_trees, max_trees, n_jobs=-1, random_state=None):
+    """Добавляет в копию леса n_new_trees деревьев, обученных на X, y, и удаляет самые старые сверх max_trees.
+
+    Возвращает (модель, время обучения) или (None, 0.0), если в пачке представлены не все классы.
+    """
+    if not np.array_equal(np.unique(y), model.classes_):
+        return None, 0.0
+    batch, train_seconds = fit_forest(X, y, n_jobs=n_jobs, n_estimators=n_new_trees, random_state=random_state)
+    # Работающая модель не меняется: её в это время используют другие сессии
+    grown = copy.copy(model)
+    keep = max(0, max_trees - n_new_trees)
+    old_trees = model.estimators_[len(model.estimators_) - keep:] if keep else []
+    grown.estimators_ = list(old_trees) + list(batch.estimators_)
+    grown.n_estimators = len(grown.estimators_)
+    return grown, train_seconds
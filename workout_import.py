@@ -0,0 +1,102 @@
+import io
+import json
+
+import numpy as np
+import pandas as pd
+
+from workout_log import WORKOUT_COLUMNS
+
+# Допустимые значения, как в форме добавления тренировки
+INTENSITIES = ("Очень легкая", "Легкая", "Средняя", "Высокая", "Очень высокая")
+MIN_DURATION = 5
+MAX_DURATION = 180
+# Форматы дат помимо ISO 8601 (экспорт истории тренировок и распространенные трекеры)
+DATE_FORMATS = ('%d.%m.%Y %H:%M', '%d.%m.%Y', '%d/%m/%Y %H:%M', '%d/%m/%Y')
+# Названия колонок в экспортах других трекеров
+COLUMN_ALIASES = {
+    'date': ('date', 'datetime', 'start_time', 'start', 'дата'),
+    'workout_type': ('workout_type', 'type', 'activity', 'activity_type', 'вид тренировки'),
+    'duration': ('duration', 'minutes', 'duration_min', 'длительность'),
+    'intensity': ('intensity', 'effort', 'интенсивность'),
+    'notes': ('notes', 'note', 'comment', 'заметки'),
+    'program_id': ('program_id',),
+    'day': ('day',),
+}
+
+
+def read_upload(data, filename):
+    """Читает CSV, JSON (массив объектов) или JSON Lines в таблицу строк"""
+    name = filename.lower()
+    if name.endswith('.csv'):
+        return pd.read_csv(io.BytesIO(data), dtype=str, keep_default_na=False)
+    if name.endswith(('.jsonl', '.ndjson')):
+        return pd.read_json(io.BytesIO(data), lines=True, dtype=False)
+    if name.endswith('.json'):
+        records = json.loads(data)
+        if isinstance(records, dict):
+            # Экспорт вида {"workouts": [...]}
+            records = next((value for value in records.values() if isinstance(value, list)), [])
+        return pd.DataFrame.from_records(records)
+    raise ValueError(f"Неподдерживаемый формат файла: {filename}")
+
+
+def normalize_columns(df):
+    """Переименовывает колонки по COLUMN_ALIASES; недостающие необязательные колонки заполняются пустыми"""
+    lookup = {str(column).strip().lower(): column for column in df.columns}
+    result = pd.DataFrame(index=df.index)
+    for column, aliases in COLUMN_ALIASES.items():
+        source = next((lookup[alias] for alias in aliases if alias in lookup), None)
+        result[column] = df[source] if source is not None else ''
+    return result
+
+
+def parse_dates(values):
+    """Разбирает даты: ISO 8601, затем форматы DATE_FORMATS; неразобранные — NaT"""
+    values = values.astype(str).str.strip()
+    dates = pd.to_datetime(values, errors='coerce', format='ISO8601')
+    if isinstance(dates.dtype, pd.DatetimeTZDtype):
+        # В журнале время хранится без часового пояса
+        dates = dates.dt.tz_localize(None)
+    for date_format in DATE_FORMATS:
+        missing = dates.isna()
+        if not missing.any():
+            break
+        dates[missing] = pd.to_datetime(values[missing], errors='coerce', format=date_format)
+    return dates
+
+
+def validate_workouts(df):
+    """Проверяет все строки целыми колонками; возвращает (принятые тренировки, отчет об ошибках)"""
+    df = normalize_columns(df)
+    dates = parse_dates(df['date'])
+    durations = pd.to_numeric(df['duration'], errors='coerce')
+    intensities = df['intensity'].astype(str).str.strip()
+    workout_types = df['workout_type'].fillna('').astype(str).str.strip()
+
+    problems = {
+        'Дата не распознана': dates.isna(),
+        f'Длительность не в диапазоне {MIN_DURATION}–{MAX_DURATION} мин': ~durations.between(MIN_DURATION, MAX_DURATION),
+        f'Интенсивность не из списка: {", ".join(INTENSITIES)}': ~intensities.isin(INTENSITIES),
+        'Не указан вид тренировки': workout_types == '',
+    }
+    problems = pd.DataFrame(problems)
+    rejected = problems.any(axis=1).values
+
+    accepted = pd.DataFrame({
+        'date': dates[~rejected].dt.strftime('%Y-%m-%d %H:%M:%S'),
+        'workout_type': workout_types[~rejected],
+        'duration': durations[~rejected].round().astype(int),
+        'intensity': intensities[~rejected],
+        'notes': df['notes'][~rejected].fillna('').astype(str),
+        'program_id': df['program_id'][~rejected].fillna('').astype(str),
+        'day': df['day'][~rejected].fillna('').astype(str),
+    }, columns=WORKOUT_COLUMNS)
+    accepted = accepted.iloc[np.argsort(dates[~rejected].values, kind='stable')]
+
+    # Номер строки в отчете считается от 1 без заголовка
+    failed = problems[rejected]
+    errors = pd.DataFrame({
+        'row': failed.index + 1,
+        'errors': ['; '.join(failed.columns[mask]) for mask in failed.values],
+    })
+    return accepted.reset_index(drop=True), errors
@@ -0,0 +1,310 @@
+import csv
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from feedback_index import complete_rows_end
+
+WORKOUT_COLUMNS = ['date', 'workout_type', 'duration', 'intensity', 'notes', 'program_id', 'day']
+# Индекс журнала (<журнал>.idx): записи (дата в нс, смещение строки в байтах), отсортированные по дате.
+# Первая запись — заголовок: размер журнала, по которому построен индекс
+INDEX_DTYPE = np.dtype([('date', '<i8'), ('offset', '<i8')])
+# Индекс строится по блокам журнала такого размера (байт); длиннее MAX_DATE_WIDTH поле даты не бывает
+INDEX_CHUNK_BYTES = 1 << 20
+MAX_DATE_WIDTH = 64
+
+
+class WorkoutLog:
+    """Журнал тренировок в CSV, в который записи только дописываются"""
+
+    def __init__(self, columns=WORKOUT_COLUMNS):
+        self.columns = list(columns)
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._pending = set()
+        # Уплотнение журналов выполняется в отдельном потоке, не задерживая страницу
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='workout-log')
+
+    def _lock_for(self, path):
+        """Возвращает блокировку для файла журнала"""
+        with self._locks_guard:
+            if path not in self._locks:
+                self._locks[path] = threading.RLock()
+            return self._locks[path]
+
+    def empty_frame(self):
+        """Пустая таблица тренировок"""
+        return pd.DataFrame(columns=self.columns)
+
+    def append(self, path, record):
+        """Дописывает одну запись в конец журнала и сбрасывает её на диск"""
+        with self._lock_for(path):
+            is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+            with open(path, 'a+b') as f:
+                size_before = f.seek(0, os.SEEK_END)
+                # Если прошлая запись оборвалась на середине, начинаем с новой строки
+                if not is_new:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) not in (b'\n', b'\r'):
+                        f.write(b'\n')
+                if is_new:
+                    f.write(self._encode_rows([self.columns]))
+                row_offset = f.tell()
+                f.write(self._encode_rows([[record.get(column, '') for column in self.columns]]))
+                f.flush()
+                os.fsync(f.fileno())
+                size_after = f.tell()
+            self._index_append(path, record['date'], row_offset, size_before, size_after)
+
+    def _encode_rows(self, rows):
+        """Кодирует строки в CSV"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerows(rows)
+        return buffer.getvalue().encode('utf-8')
+
+    def append_many(self, path, df):
+        """Дописывает пачку записей одной записью в файл и одним сбросом на диск"""
+        with self._lock_for(path):
+            is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+            with open(path, 'a+b') as f:
+                if not is_new:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) not in (b'\n', b'\r'):
+                        f.write(b'\n')
+                rows = df.reindex(columns=self.columns).fillna('').values.tolist()
+                f.write(self._encode_rows(([self.columns] if is_new else []) + rows))
+                f.flush()
+                os.fsync(f.fileno())
+            # Пачка может содержать прошлые даты: индекс проще построить заново при следующем чтении
+            self._drop_index(path)
+
+    # Индекс по датам
+    def _index_path(self, path):
+        return path + '.idx'
+
+    def _drop_index(self, path):
+        if os.path.exists(self._index_path(path)):
+            os.remove(self._index_path(path))
+
+    def _index_append(self, path, date, row_offset, size_before, size_after):
+        """Добавляет строку в индекс; устаревший индекс удаляется и будет построен заново при чтении"""
+        index_path = self._index_path(path)
+        if not os.path.exists(index_path):
+            return
+        date_ns = pd.Timestamp(date).value
+        with open(index_path, 'r+b') as f:
+            header = np.frombuffer(f.read(INDEX_DTYPE.itemsize), dtype=INDEX_DTYPE)
+            if header.size == 0 or header['date'][0] != size_before:
+                f.close()
+                self._drop_index(path)
+                return
+            entry = np.array([(date_ns, row_offset)], dtype=INDEX_DTYPE)
+            end = f.seek(0, os.SEEK_END)
+            last = None
+            if end > INDEX_DTYPE.itemsize:
+                f.seek(-INDEX_DTYPE.itemsize, os.SEEK_END)
+                last = np.frombuffer(f.read(INDEX_DTYPE.itemsize), dtype=INDEX_DTYPE)['date'][0]
+            if last is None or date_ns >= last:
+                f.write(entry.tobytes())
+                # Заголовок обновляется последним: оборванная запись сделает индекс устаревшим, а не неверным
+                f.seek(0)
+                f.write(np.array([(size_after, 0)], dtype=INDEX_DTYPE).tobytes())
+                f.flush()
+                return
+        # Тренировка задним числом: вставляем запись на её место по дате
+        entries = np.fromfile(index_path, dtype=INDEX_DTYPE)[1:]
+        position = np.searchsorted(entries['date'], date_ns, side='right')
+        self._write_index(path, np.insert(entries, position, entry), size_after)
+
+    def _write_index(self, path, entries, size):
+        index_path = self._index_path(path)
+        temp_path = index_path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(np.array([(size, 0)], dtype=INDEX_DTYPE).tobytes())
+            f.write(entries.tobytes())
+        os.replace(temp_path, index_path)
+
+    def _block_entries(self, data, base, skip_header):
+        """Записи индекса для блока целых строк журнала, начинающегося со смещения base"""
+        raw = np.frombuffer(data, dtype=np.uint8)
+        in_quotes = np.cumsum(raw == ord('"')) % 2 == 1
+        line_ends = np.flatnonzero((raw == ord('\n')) & ~in_quotes)
+        # Последняя строка файла может быть без перевода строки
+        if not line_ends.size or line_ends[-1] + 1 < len(data):
+            line_ends = np.append(line_ends, len(data))
+        starts = np.concatenate([[0], line_ends[:-1] + 1])
+        if skip_header:
+            starts, line_ends = starts[1:], line_ends[1:]
+        if not starts.size:
+            return np.empty(0, dtype=INDEX_DTYPE)
+
+        # Дата — первое поле: до первой запятой строки
+        commas = np.flatnonzero(raw == ord(','))
+        position = np.searchsorted(commas, starts)
+        next_comma = commas[np.minimum(position, commas.size - 1)] if commas.size else line_ends
+        field_ends = np.minimum(np.where(position < commas.size, next_comma, line_ends), line_ends)
+        widths = np.clip(field_ends - starts, 0, MAX_DATE_WIDTH)
+        width = max(int(widths.max()), 1)
+        # Поля дат собираются в массив строк фиксированной ширины и разбираются одним вызовом
+        columns = np.arange(width)
+        cells = raw[np.minimum(starts[:, None] + columns, len(raw) - 1)]
+        cells = np.where(columns < widths[:, None], cells, 0).astype(np.uint8)
+        text = np.char.decode(cells.view(f'S{width}').ravel(), 'utf-8', 'replace')
+        dates = pd.to_datetime(pd.Series(text, dtype=object), errors='coerce', format='ISO8601')
+        valid = dates.notna().values
+        entries = np.empty(int(valid.sum()), dtype=INDEX_DTYPE)
+        entries['date'] = dates[valid].values.astype('datetime64[ns]').astype(np.int64)
+        entries['offset'] = base + starts[valid]
+        return entries
+
+    def _build_index(self, path):
+        """Строит индекс по журналу блоками по INDEX_CHUNK_BYTES: смещения строк и их даты.
+
+        Перевод строки в кавычках строку не завершает; незавершенная строка переносится в следующий блок.
+        """
+        parts = []
+        size = 0
+        pending = b''
+        with open(path, 'rb') as f:
+            while True:
+                block = f.read(INDEX_CHUNK_BYTES)
+                data = pending + block
+                # В конце файла последняя строка учитывается и без перевода строки
+                end = complete_rows_end(data) if block else len(data)
+                if end:
+                    parts.append(self._block_entries(data[:end], size, skip_header=size == 0))
+                    size += end
+                pending = data[end:]
+                if not block:
+                    break
+        entries = np.concatenate(parts) if parts else np.empty(0, dtype=INDEX_DTYPE)
+        entries = entries[np.lexsort((entries['offset'], entries['date']))]
+        self._write_index(path, entries, size)
+
+    def _load_index(self, path):
+        """Индекс журнала, отображенный в память (при необходимости строится заново)"""
+        index_path = self._index_path(path)
+        with self._lock_for(path):
+            size = os.path.getsize(path)
+            header = np.fromfile(index_path, dtype=INDEX_DTYPE, count=1) if os.path.exists(index_path) else None
+            if header is None or header.size == 0 or header['date'][0] != size:
+                self._build_index(path)
+            if os.path.getsize(index_path) == INDEX_DTYPE.itemsize:
+                return np.empty(0, dtype=INDEX_DTYPE)
+            return np.memmap(index_path, dtype=INDEX_DTYPE, mode='r', offset=INDEX_DTYPE.itemsize)
+
+    def query(self, path, start=None, end=None, limit=10, cursor=None):
+        """Страница тренировок от новых к старым за [start, end); читаются только строки страницы.
+
+        cursor — (дата, смещение) последней строки предыдущей страницы.
+        """
+        result = {'workouts': self.empty_frame(), 'next_cursor': None, 'total': 0}
+        if not os.path.exists(path):
+            return result
+        index = self._load_index(path)
+        dates = index['date']
+        lo = np.searchsorted(dates, pd.Timestamp(start).value, side='left') if start is not None else 0
+        hi = np.searchsorted(dates, pd.Timestamp(end).value, side='left') if end is not None else len(index)
+        result['total'] = int(max(hi - lo, 0))
+        if cursor is not None:
+            cursor_date = pd.Timestamp(cursor[0]).value
+            first = np.searchsorted(dates, cursor_date, side='left')
+            last = np.searchsorted(dates, cursor_date, side='right')
+            hi = min(hi, first + np.searchsorted(index['offset'][first:last], cursor[1], side='left'))
+        page = np.array(index[max(lo, hi - limit):hi][::-1])
+        if page.size == 0:
+            return result
+
+        with self._lock_for(path), open(path, 'r', encoding='utf-8', newline='') as f:
+            rows = []
+            for offset in page['offset']:
+                f.seek(int(offset))
+                rows.append(next(csv.reader(f)))
+        df = pd.DataFrame([row + [''] * (len(self.columns) - len(row)) for row in rows], columns=self.columns)
+        df['date'] = pd.to_datetime(page['date'])
+        df['duration'] = pd.to_numeric(df['duration'], errors='coerce').fillna(0).astype(int)
+        result['workouts'] = df
+        if hi - limit > lo:
+            result['next_cursor'] = (pd.Timestamp(int(page['date'][-1])).isoformat(), int(page['offset'][-1]))
+        return result
+
+    def _read_raw(self, path):
+        """Читает журнал и отделяет корректные записи от поврежденных"""
+        return self._parse(pd.read_csv(path, dtype=str, keep_default_na=False, on_bad_lines='skip', encoding='utf-8'))
+
+    def _parse(self, df):
+        """Разбирает даты и длительности; возвращает (df, даты, длительности, маска корректных строк).
+
+        Колонки df остаются исходными строками: при уплотнении они записываются обратно без изменений.
+        """
+        for column in self.columns:
+            if column not in df.columns:
+                df[column] = ''
+        dates = pd.to_datetime(df['date'], errors='coerce', format='ISO8601')
+        durations = pd.to_numeric(df['duration'], errors='coerce')
+        valid = dates.notna() & durations.notna()
+        return df, dates, durations, valid
+
+    def read(self, path):
+        """Читает журнал; поврежденные строки пропускаются и уплотняются в фоне"""
+        if not os.path.exists(path):
+            return self.empty_frame()
+        with self._lock_for(path):
+            df, dates, durations, valid = self._read_raw(path)
+        needs_compaction = not valid.all() or not dates[valid].is_monotonic_increasing
+        df = df[valid].copy()
+        df['date'] = dates[valid]
+        df['duration'] = durations[valid].astype(int)
+        if needs_compaction:
+            self.schedule_compaction(path)
+        return df
+
+    def iter_chunks(self, path, chunk_size=10_000):
+        """Журнал блоками по chunk_size строк в порядке файла; поврежденные строки пропускаются"""
+        if not os.path.exists(path):
+            return
+        # Уплотнение подменяет файл через os.replace, поэтому открытый файл дочитывается без блокировки
+        with pd.read_csv(path, dtype=str, keep_default_na=False, on_bad_lines='skip', encoding='utf-8',
+                         chunksize=chunk_size) as reader:
+            for chunk in reader:
+                df, dates, durations, valid = self._parse(chunk)
+                df = df.loc[valid, self.columns].copy()
+                df['date'] = dates[valid]
+                df['duration'] = durations[valid].astype(int)
+                yield df
+
+    def schedule_compaction(self, path):
+        """Ставит уплотнение журнала в фоновую очередь (не более одного раза)"""
+        with self._locks_guard:
+            if path in self._pending:
+                return
+            self._pending.add(path)
+        self._executor.submit(self.compact, path)
+
+    def compact(self, path):
+        """Переписывает журнал без поврежденных строк в хронологическом порядке"""
+        try:
+            with self._lock_for(path):
+                if not os.path.exists(path):
+                    return
+                df, dates, durations, valid = self._read_raw(path)
+                order = dates[valid].sort_values(kind='stable').index
+                df = df.loc[order, self.columns]
+                temp_path = path + '.tmp'
+                with open(temp_path, 'w', newline='', encoding='utf-8') as f:
+                    df.to_csv(f, index=False, lineterminator='\n')
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, path)
+                # Смещения строк изменились
+                self._drop_index(path)
+        except Exception as e:
+            print(f"❌ Ошибка уплотнения журнала {path}: {e}")
+        finally:
+            with self._locks_guard:
+                self._pending.discard(path)
@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from streaks import analyze_streaks
+
+# Окно счетчика «тренировок за месяц», дней до сегодняшнего
+MONTH_DAYS = 30
+
+
+def empty_stats():
+    """Пустая сводка тренировок пользователя"""
+    return {
+        'total_workouts': 0,
+        'total_minutes': 0,
+        'type_counts': {},
+        'last_date': None,
+        'last_day': None,
+        'current_run': 0,
+        'longest_streak': 0,
+        'needs_rebuild': False,
+        'source_version': None
+    }
+
+
+def apply_workout(stats, date, duration, workout_type):
+    """Обновляет сводку одной новой тренировкой за O(1)"""
+    date = pd.Timestamp(date).to_pydatetime()
+    day = date.date()
+
+    stats['total_workouts'] += 1
+    stats['total_minutes'] += int(duration)
+    type_counts = stats['type_counts']
+    type_counts[workout_type] = type_counts.get(workout_type, 0) + 1
+
+    last_day = datetime.fromisoformat(stats['last_day']).date() if stats['last_day'] else None
+    if last_day is None or (day - last_day).days > 1:
+        stats['current_run'] = 1
+    elif (day - last_day).days == 1:
+        stats['current_run'] += 1
+    elif day < last_day:
+        # Тренировка задним числом: серию можно посчитать только по всему журналу
+        stats['needs_rebuild'] = True
+    if last_day is None or day >= last_day:
+        stats['last_day'] = day.isoformat()
+        stats['last_date'] = date.isoformat()
+    stats['longest_streak'] = max(stats['longest_streak'], stats['current_run'])
+    return stats
+
+
+def build_stats(df):
+    """Полностью пересчитывает сводку по журналу тренировок"""
+    stats = empty_stats()
+    if df.empty:
+        return stats
+
+    dates = pd.to_datetime(df['date'])
+    stats['total_workouts'] = int(len(df))
+    stats['total_minutes'] = int(df['duration'].sum())
+    stats['type_counts'] = {str(k): int(v) for k, v in df['workout_type'].value_counts().items()}
+
+    last_date = dates.max().to_pydatetime()
+    stats['last_date'] = last_date.isoformat()
+    stats['last_day'] = last_date.date().isoformat()
+
+    # Серии подряд идущих дней
+    streak_info = analyze_streaks(dates.values)
+    stats['current_run'] = streak_info['last_run']
+    stats['longest_streak'] = streak_info['longest_streak']
+    return stats
+
+
+def summarize(stats, recent_days=None, now=None):
+    """Возвращает статистику в формате get_statistics (счетчик за MONTH_DAYS дней — по строкам дневной сводки)"""
+    if not stats or stats['total_workouts'] == 0:
+        return {}
+    now = now or datetime.now()
+    last_date = datetime.fromisoformat(stats['last_date'])
+    month_border = pd.Timestamp((now - timedelta(days=MONTH_DAYS)).date())
+    workouts_this_month = 0
+    if recent_days is not None and not recent_days.empty:
+        workouts_this_month = int(recent_days['sessions'][recent_days.index >= month_border].sum())
+
+    # Текущая серия засчитывается, только если последняя тренировка сегодня
+    current_streak = stats['current_run'] if last_date.date() == now.date() else 0
+
+    type_counts = stats['type_counts']
+    if type_counts:
+        top = max(type_counts.values())
+        favorite = min(name for name, count in type_counts.items() if count == top)
+    else:
+        favorite = "Нет данных"
+
+    return {
+        'total_workouts': stats['total_workouts'],
+        'total_minutes': stats['total_minutes'],
+        'avg_duration': stats['total_minutes'] / stats['total_workouts'],
+        'workouts_this_month': workouts_this_month,
+        'last_workout': pd.Timestamp(last_date),
+        'workout_streak': current_streak,
+        'longest_streak': stats['longest_streak'],
+        'favorite_workout': favorite
+    }